@@ -0,0 +1,289 @@
+"""
+Modo headless: serviço HTTP/JSON local com os mesmos números do dashboard,
+sem subir o Streamlit.
+
+    python api_server.py --port 8502 --workers 8
+
+Endpoints (GET):
+  /health               -> status + versão da base
+  /metrics              -> compute_metrics (cards da Company View)
+  /general-profile      -> general_profile._aggregate (período atual e anterior)
+  /top-buyers-sellers   -> Top-N compradores / vendedores (param opcional top_n)
+  /short-interest-peaks -> short interest diário, limiar e picos detectados
+  /reconciliation       -> reconciliação de saldos da base inteira (params: tolerance, max_issues)
+
+Período: ?preset=<um dos PERIOD_PRESETS> ou ?start=YYYY-MM-DD&end=YYYY-MM-DD.
+Os presets são ancorados na última semana fechada da base, não na data de hoje.
+As respostas ficam em cache (LRU) por (rota, query, versão da base).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from utils.load_data import DEFAULT_DATA_PATH, data_path, data_version, load_broker_data
+from utils.periods import PERIOD_PRESETS, data_anchor, get_period_by_preset, previous_period_by_preset
+from utils.distinct_sketch import get_distinct_counter
+from utils.reconciliation import reconciliation_report
+from utils.short_interest import detect_short_interest_peaks
+from components.metrics import compute_metrics
+from components.general_profile import _aggregate, _normalize_columns
+from components.top_buyers_sellers import _normalize, top_buyers_and_sellers
+
+
+# --- base de dados (recarrega quando a versão do arquivo muda) ---
+class DataStore:
+    def __init__(self, file_path: str = DEFAULT_DATA_PATH):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._df: pd.DataFrame | None = None
+        self._version: str | None = None
+
+    def get(self) -> tuple[pd.DataFrame, str]:
+        version = data_version(self.file_path)
+        with self._lock:
+            if self._df is None or version != self._version:
+                self._df = load_broker_data(self.file_path)
+                self._version = version
+            return self._df, self._version
+
+
+# --- cache de respostas (LRU) ---
+class ResponseCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._items: OrderedDict[tuple, bytes] = OrderedDict()
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key: tuple, body: bytes) -> None:
+        with self._lock:
+            self._items[key] = body
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+# --- período ---
+def resolve_period(params: dict[str, str], today=None) -> dict:
+    """
+    Resolve preset ou intervalo customizado em (start, end, prev_start, prev_end).
+    today: referência dos presets (data_anchor da base: última semana fechada com dados).
+    """
+    preset = params.get("preset")
+    if "start" in params or "end" in params:
+        if not ("start" in params and "end" in params):
+            raise ValueError("Custom range needs both 'start' and 'end'.")
+        start = pd.to_datetime(params["start"]).normalize()
+        end = pd.to_datetime(params["end"]).normalize()
+        if end < start:
+            raise ValueError("'end' must be on or after 'start'.")
+        preset = None
+    else:
+        preset = preset or PERIOD_PRESETS[0]
+        if preset not in PERIOD_PRESETS:
+            raise ValueError(f"Unknown preset {preset!r}. Use one of {PERIOD_PRESETS}.")
+        start, end = get_period_by_preset(preset, today)
+
+    prev_start, prev_end = previous_period_by_preset(preset, start, end)
+    return {"preset": preset, "start": start, "end": end,
+            "prev_start": prev_start, "prev_end": prev_end}
+
+
+def _slice(df: pd.DataFrame, start, end) -> pd.DataFrame:
+    return df[(df["date"] >= start) & (df["date"] <= end)]
+
+
+def _int_param(params: dict[str, str], name: str, default: int) -> int:
+    """Parâmetro inteiro >= 0 da query (ValueError -> 400)."""
+    raw = params.get(name, default)
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be an integer, got {raw!r}.") from None
+    if value < 0:
+        raise ValueError(f"'{name}' must be >= 0, got {value}.")
+    return value
+
+
+# --- endpoints ---
+def _metrics(df, period, params):
+    cur_df = _slice(df, period["start"], period["end"])
+    prev_df = _slice(df, period["prev_start"], period["prev_end"])
+    return compute_metrics(cur_df, prev_df, distinct_counter=get_distinct_counter(df))
+
+
+def _general_profile(df, period, params):
+    counter = get_distinct_counter(df)
+    cur_df = _slice(df, period["start"], period["end"])
+    prev_df = _slice(df, period["prev_start"], period["prev_end"])
+    return {
+        "current": _aggregate(_normalize_columns(cur_df), counter) if not cur_df.empty else None,
+        "previous": _aggregate(_normalize_columns(prev_df), counter) if not prev_df.empty else None,
+    }
+
+
+def _top_buyers_sellers(df, period, params):
+    top_n = _int_param(params, "top_n", 5)
+    cur_df = _slice(df, period["start"], period["end"])
+    if cur_df.empty:
+        return {"buyers": [], "sellers": []}
+    buyers, sellers = top_buyers_and_sellers(_normalize(cur_df), top_n)
+    return {"buyers": buyers.to_dict("records"), "sellers": sellers.to_dict("records")}
+
+
+def _short_interest_peaks(df, period, params):
+    cur_df = _slice(df, period["start"], period["end"])
+    if cur_df.empty:
+        return {"series": [], "peaks": [], "threshold": None, "method": None}
+    sir_by_date, peaks_by_date, threshold, method_label = detect_short_interest_peaks(cur_df)
+    return {
+        "series": sir_by_date.to_dict("records"),
+        "peaks": peaks_by_date.to_dict("records"),
+        "threshold": threshold,
+        "method": method_label,
+    }
+
+
+def _reconciliation(df, period, params):
+    # base inteira: o período não se aplica
+    max_issues = _int_param(params, "max_issues", 1000)
+    return reconciliation_report(df, tolerance=float(params.get("tolerance", 0)), max_issues=max_issues)
+
+
+ROUTES = {
+    "/metrics": _metrics,
+    "/general-profile": _general_profile,
+    "/top-buyers-sellers": _top_buyers_sellers,
+    "/short-interest-peaks": _short_interest_peaks,
+    "/reconciliation": _reconciliation,
+}
+
+
+def _jsonable(obj):
+    """Converte tipos numpy/pandas e NaN para JSON puro."""
+    if isinstance(obj, dict):
+        return {str(k): _jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(v) for v in obj]
+    if isinstance(obj, pd.Series):
+        return _jsonable(obj.tolist())
+    if isinstance(obj, (pd.Timestamp, np.datetime64)):
+        return None if pd.isna(obj) else pd.Timestamp(obj).strftime("%Y-%m-%d")
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    return obj
+
+
+# --- HTTP ---
+class ApiHandler(BaseHTTPRequestHandler):
+    server: "PooledHTTPServer"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        handler = ROUTES.get(url.path)
+        if handler is None and url.path != "/health":
+            return self._send(404, json.dumps({"error": f"Unknown endpoint {url.path}"}).encode())
+
+        try:
+            df, version = self.server.store.get()  # base ausente/ilegível -> 500 (inclusive no /health)
+            if handler is None:  # /health
+                body = json.dumps({"status": "ok", "data_version": version}).encode()
+            else:
+                key = (url.path, tuple(sorted(params.items())), version)
+                body = self.server.cache.get(key)
+                if body is None:
+                    period = resolve_period(params, data_anchor(df["date"]))
+                    payload = {
+                        "data_version": version,
+                        "period": period,
+                        "data": handler(df, period, params),
+                    }
+                    body = json.dumps(_jsonable(payload)).encode()
+                    self.server.cache.put(key, body)
+        except ValueError as exc:
+            return self._send(400, json.dumps({"error": str(exc)}).encode())
+        except Exception as exc:  # nunca derruba a conexão sem resposta
+            self.log_error("%s failed: %r", self.path, exc)
+            traceback.print_exc()
+            return self._send(500, json.dumps({"error": f"Internal server error: {type(exc).__name__}"}).encode())
+
+        self._send(200, body)
+
+    def _send(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer que atende cada conexão num pool fixo de workers."""
+
+    def __init__(self, address, handler, *, store: DataStore, cache: ResponseCache, workers: int = 8):
+        super().__init__(address, handler)
+        self.store = store
+        self.cache = cache
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broker Trading Barometer – JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--cache-size", type=int, default=256)
+    parser.add_argument("--data", default=data_path())
+    args = parser.parse_args()
+
+    server = PooledHTTPServer(
+        (args.host, args.port), ApiHandler,
+        store=DataStore(args.data), cache=ResponseCache(args.cache_size), workers=args.workers,
+    )
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,68 +3,122 @@ import pandas as pd
 from pathlib import Path
 import streamlit as st
 
-from utils.load_data import load_broker_data
+from utils.load_data import data_path, data_version, load_broker_data
+from utils.perf import timed, last_timing, render_timings_sidebar
 from components.layout import set_global_styles, render_sidebar_brand
 from utils.periods_sidebar import render_period_sidebar
+from utils.rolling_flow import get_rolling_flow_engine
+from utils.distinct_sketch import get_distinct_counter
 
-from components.metrics import compute_metrics
+from components.metrics import compute_metrics, build_trend_frame
 from components.cards import render_metric_cards
 from components.short_interest import render_short_interest
 from components.general_profile import render_general_profile
 from components.top_buyers_sellers import render_top_buyers_sellers
+from components.concentration import render_concentration
+from components.efficiency import render_efficiency
+from components.data_quality import render_data_quality
+from components.net_flow_heatmap import render_net_flow_heatmap
 from components.weekly_top5_interleaved import render_weekly_trading_demo # << use a função de alto nível
 
-def main():
-    # 1) Page + global CSS
-    st.set_page_config(page_title="Broker Trading Barometer", layout="wide")
-    set_global_styles()
+@st.cache_data(show_spinner=False)
+def _trend_frame(data_version: str | None, start_date, end_date, _cur_df: pd.DataFrame) -> pd.DataFrame:
+    """Tendência dos cards (uma passada de groupby), em cache por período e versão da base."""
+    return build_trend_frame(_cur_df)
 
-    # 2) Brand na sidebar
-    win_logo = Path(r"C:\Projects\valore_dashboard_brokers\assets\logo.png")
-    logo_path = str(win_logo) if win_logo.exists() else "assets/logo.png"
-    render_sidebar_brand(title="Broker Trading Barometer", logo_path=logo_path)
-
-    # 3) Carrega base
-    df = load_broker_data()
-    if "date" in df.columns:
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_data(file_path: str, version: str) -> pd.DataFrame:
+    """Base carregada uma vez por versão (compartilhada entre sessões; não mutar)."""
+    df = load_broker_data(file_path)
+    if "date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["date"]):
         df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    return df
 
-    # 4) Sidebar → seção + períodos
-    section, preset, start_date, end_date, cur_df, prev_df, period_label = render_period_sidebar(
-        df,
-        date_col="date",
-        sections=[
-            "Company View",
-            "Short Interest",
-            "General Profile",
-            "Top Buyers & Sellers",
-            "Weekly Trading (demo)",  # <- nome padronizado
-        ],
-        show_filters_title=False,
-    )
+@st.fragment
+def _render_section(section: str, df: pd.DataFrame, start_date, end_date,
+                    cur_df: pd.DataFrame, prev_df: pd.DataFrame) -> None:
+    """
+    Região de conteúdo. Como fragment, widgets internos da seção (ranking, janelas, ordenação)
+    reexecutam só esta região, não o app inteiro.
+    """
+    with timed(f"section · {section}"):
+        if section == "Company View":
+            grouped_df = _trend_frame(df.attrs.get("data_version"), start_date, end_date, cur_df)
+            metrics = compute_metrics(cur_df, prev_df, grouped_df=grouped_df,
+                                      distinct_counter=get_distinct_counter(df))
+            render_metric_cards(metrics, cols_per_row=4, title=section)
+
+        elif section == "Short Interest":
+            render_short_interest(cur_df)
+
+        elif section == "General Profile":
+            render_general_profile(cur_df, prev_df, df)
+
+        elif section == "Top Buyers & Sellers":
+            render_top_buyers_sellers(cur_df, top_n=5, show_tables=False,
+                                      flow_engine=get_rolling_flow_engine(df, windows=(5, 20, 60)))
+
+        elif section == "Concentration":
+            render_concentration(df, cur_df, prev_df)
 
-    # 5) Conteúdo principal
-    if section == "Company View":
-        metrics = compute_metrics(cur_df, prev_df)
-        render_metric_cards(metrics, cols_per_row=4, title=section)
+        elif section == "Efficiency":
+            render_efficiency(df, cur_df, prev_df)
 
-    elif section == "Short Interest":
-        render_short_interest(cur_df)
+        elif section == "Net Flow Heatmap":
+            render_net_flow_heatmap(df)  # histórico completo, independe do período
 
-    elif section == "General Profile":
-        render_general_profile(cur_df, prev_df)
+        elif section == "Data Quality":
+            render_data_quality(df)
 
-    elif section == "Top Buyers & Sellers":
-        render_top_buyers_sellers(cur_df, top_n=5, show_tables=False)
+        elif section == "Weekly Trading (demo)":
+            render_weekly_trading_demo()
 
+        else:
+            st.info("Select a section in the sidebar.")
 
-    elif section == "Weekly Trading (demo)":
-        render_weekly_trading_demo()    
-        
+    ms = last_timing(f"section · {section}")
+    if ms is not None:
+        st.caption(f"Section rendered in {ms:,.0f} ms")
+
+def main():
+    # 1) Page + global CSS (CSS montado uma vez por processo)
+    st.set_page_config(page_title="Broker Trading Barometer", layout="wide")
+    with timed("setup · styles + brand"):
+        set_global_styles()
+
+        # 2) Brand na sidebar (logo codificado uma vez)
+        win_logo = Path(r"C:\Projects\valore_dashboard_brokers\assets\logo.png")
+        logo_path = str(win_logo) if win_logo.exists() else "assets/logo.png"
+        render_sidebar_brand(title="Broker Trading Barometer", logo_path=logo_path)
+
+    # 3) Carrega base (cache por versão dos dados; datas já convertidas)
+    with timed("setup · data"):
+        path = data_path()
+        df = _load_data(path, data_version(path))
+
+    # 4) Sidebar → seção + períodos
+    with timed("setup · period filter"):
+        section, preset, start_date, end_date, cur_df, prev_df, period_label = render_period_sidebar(
+            df,
+            date_col="date",
+            sections=[
+                "Company View",
+                "Short Interest",
+                "General Profile",
+                "Top Buyers & Sellers",
+                "Concentration",
+                "Efficiency",
+                "Net Flow Heatmap",
+                "Data Quality",
+                "Weekly Trading (demo)",  # <- nome padronizado
+            ],
+            show_filters_title=False,
+        )
 
+    # 5) Conteúdo principal (fragment: reruns de widgets da seção ficam restritos a ela)
+    _render_section(section, df, start_date, end_date, cur_df, prev_df)
 
-    else:
-        st.info("Select a section in the sidebar.")
+    render_timings_sidebar()
 
 if __name__ == "__main__":
     main()
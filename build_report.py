@@ -0,0 +1,226 @@
+"""
+Relatório estático (HTML único, autocontido) para envio semanal por e-mail,
+sem subir o Streamlit.
+
+    python build_report.py --out reports/barometer.html --workers 4
+
+Para cada entrada de PERIOD_PRESETS (ancorados na última semana fechada da base):
+cards da Company View, General Profile, Top Buyers & Sellers e Short Interest.
+Cada (preset, seção) é calculado e renderizado num processo do pool;
+cada worker carrega a base uma vez (column store via memory map).
+Os gráficos usam apply_plotly_theme e saem sem o Plotly JS, que entra uma única vez
+no <head> do arquivo.
+"""
+from __future__ import annotations
+
+import argparse
+import html
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+from utils.load_data import data_path, load_broker_data
+from utils.periods import PERIOD_PRESETS, data_anchor, resolve_presets
+from utils.distinct_sketch import get_distinct_counter
+from utils.peak_attribution import attribute_short_interest_peaks
+from utils.profile_flow import ProfileFlow, decompose_change
+from utils.short_interest import detect_short_interest_peaks
+from components.theme import apply_plotly_theme
+from components.cards import _format_delta, _format_value, _sparkline_svg
+from components.metrics import build_trend_frame, compute_metrics
+from components.general_profile import _aggregate, _change_figure, _normalize_columns, _profile_pie
+from components.short_interest import _attribution_figures, _short_interest_figure
+from components.top_buyers_sellers import _bar_h, _normalize, top_buyers_and_sellers
+
+REPORT_SECTIONS = ["Company View", "General Profile", "Top Buyers & Sellers", "Short Interest"]
+
+# estado de cada worker (preenchido no initializer)
+_WORKER: dict = {}
+
+
+def _init_worker(file_path: str, dark: bool) -> None:
+    df = load_broker_data(file_path)
+    if not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    _WORKER.update(df=df, dark=dark, profile_flow=None)
+
+
+def _slice(df: pd.DataFrame, start, end) -> pd.DataFrame:
+    return df[(df["date"] >= start) & (df["date"] <= end)]
+
+
+# --- HTML ---
+def _fig_html(fig) -> str:
+    apply_plotly_theme(fig, dark=_WORKER["dark"])
+    return fig.to_html(full_html=False, include_plotlyjs=False, config={"displaylogo": False, "responsive": True})
+
+
+def _cards_html(metrics: list[dict]) -> str:
+    cards = []
+    for m in metrics:
+        delta = _format_delta(m.get("current"), m.get("previous"))
+        inverse = m.get("delta_color") == "inverse"
+        cls = "" if delta is None else ("up" if delta.startswith("+") != inverse else "down")
+        spark = _sparkline_svg(m.get("trend")) or ""
+        title = f' title="{html.escape(m["help"])}"' if m.get("help") else ""
+        cards.append(
+            f'<div class="card"{title}><div class="label">{html.escape(m.get("label", ""))}</div>'
+            f'<div class="value">{html.escape(_format_value(m.get("fmt", "raw"), m.get("current")))}</div>'
+            f'<div class="delta {cls}">{delta or "—"}</div>{spark}</div>'
+        )
+    return f'<div class="cards">{"".join(cards)}</div>'
+
+
+def _grid(*blocks: str) -> str:
+    return f'<div class="grid">{"".join(f"<div>{b}</div>" for b in blocks)}</div>'
+
+
+def _empty() -> str:
+    return '<p class="empty">No data in the selected period.</p>'
+
+
+# --- seções ---
+def _company_view(cur_df, prev_df) -> str:
+    metrics = compute_metrics(cur_df, prev_df, grouped_df=build_trend_frame(cur_df),
+                              distinct_counter=get_distinct_counter(_WORKER["df"]))
+    return _cards_html(metrics)
+
+
+def _general_profile(cur_df, prev_df) -> str:
+    cur = _normalize_columns(cur_df)
+    cur_agg = _aggregate(cur, get_distinct_counter(_WORKER["df"]))
+    prev_agg = _aggregate(_normalize_columns(prev_df), get_distinct_counter(_WORKER["df"])) \
+        if not prev_df.empty else {}
+    cards = _cards_html([
+        {"label": "Buy Volume", "current": cur_agg["total_buy"], "previous": prev_agg.get("total_buy"), "fmt": "int"},
+        {"label": "Sell Volume", "current": cur_agg["total_sell"], "previous": prev_agg.get("total_sell"), "fmt": "int"},
+        {"label": "VWAP Buy (w)", "current": cur_agg["w_buy_vwap"], "previous": prev_agg.get("w_buy_vwap"), "fmt": "float4"},
+        {"label": "VWAP Sell (w)", "current": cur_agg["w_sell_vwap"], "previous": prev_agg.get("w_sell_vwap"), "fmt": "float4"},
+        {"label": "Anonymous Activity", "current": cur_agg["anon_pct"], "previous": prev_agg.get("anon_pct"), "fmt": "pct"},
+        {"label": "Top Profile", "current": cur_agg["top_profile"], "previous": None, "fmt": "raw"},
+        {"label": "Brokers", "current": cur_agg["n_entities"], "previous": prev_agg.get("n_entities"), "fmt": "int"},
+    ])
+    blocks = [_fig_html(_profile_pie(cur))]
+    if not prev_df.empty:
+        if _WORKER["profile_flow"] is None:
+            _WORKER["profile_flow"] = ProfileFlow(_WORKER["df"])
+        flow = _WORKER["profile_flow"]
+        dec = decompose_change(flow.totals(prev_df["date"].min(), prev_df["date"].max()),
+                               flow.totals(cur_df["date"].min(), cur_df["date"].max()), "gross")
+        blocks.append(_fig_html(_change_figure(dec, "Gross volume (buy + sell)")))
+    return cards + _grid(*blocks)
+
+
+def _top_buyers_sellers(cur_df, prev_df, top_n: int = 5) -> str:
+    buyers, sellers = top_buyers_and_sellers(_normalize(cur_df), top_n)
+    return _grid(
+        _fig_html(_bar_h(buyers, "buy_volume", "broker", f"Top {top_n} Buyers – Accumulated Volume", "#2ecc71")),
+        _fig_html(_bar_h(sellers, "sell_volume", "broker", f"Top {top_n} Sellers – Accumulated Volume", "#e74c3c")),
+    )
+
+
+def _short_interest(cur_df, prev_df) -> str:
+    sir_by_date, peaks_by_date, threshold, method_label = detect_short_interest_peaks(cur_df)
+    out = _fig_html(_short_interest_figure(sir_by_date, peaks_by_date, threshold, method_label))
+    if peaks_by_date.empty:
+        return out + '<p class="empty">No peaks detected for the selected period.</p>'
+    attr = attribute_short_interest_peaks(cur_df, peaks_by_date["date"])
+    return out + _grid(*(_fig_html(f) for f in _attribution_figures(attr)))
+
+
+_RENDERERS = {
+    "Company View": _company_view,
+    "General Profile": _general_profile,
+    "Top Buyers & Sellers": _top_buyers_sellers,
+    "Short Interest": _short_interest,
+}
+
+
+def render_block(preset: str, section: str, period: dict) -> tuple[str, str, str, float]:
+    """Uma tarefa do pool: (preset, seção, HTML, ms)."""
+    t0 = time.perf_counter()
+    df = _WORKER["df"]
+    cur_df = _slice(df, period["start"], period["end"])
+    prev_df = _slice(df, period["prev_start"], period["prev_end"])
+    body = _RENDERERS[section](cur_df, prev_df) if not cur_df.empty else _empty()
+    return preset, section, body, (time.perf_counter() - t0) * 1000.0
+
+
+# --- documento ---
+_CSS = """
+body{font-family:Inter,Arial,sans-serif;margin:0;background:%(bg)s;color:%(fg)s}
+header{padding:24px 32px;border-bottom:1px solid %(line)s}
+header h1{margin:0 0 4px;font-size:24px} header p{margin:0;opacity:.7}
+nav{padding:8px 32px} nav a{color:#29b5e8;margin-right:16px;text-decoration:none}
+main{padding:0 32px 32px} h2{margin-top:36px;border-bottom:2px solid #29b5e8;padding-bottom:4px}
+h3{margin:24px 0 8px;font-size:17px} .period{opacity:.7;font-size:14px}
+.cards{display:grid;grid-template-columns:repeat(4,minmax(0,1fr));gap:12px}
+.card{border:1px solid %(line)s;border-radius:8px;padding:10px 14px}
+.card .label{font-size:13px;opacity:.75} .card .value{font-size:22px;font-weight:600;margin:2px 0}
+.card .delta{font-size:13px} .card .delta.up{color:#22c55e} .card .delta.down{color:#FF6B6B}
+.grid{display:grid;grid-template-columns:repeat(2,minmax(0,1fr));gap:16px}
+.empty{opacity:.7;font-style:italic}
+"""
+
+
+def build_report(file_path: str | None = None, workers: int | None = None, dark: bool = False) -> str:
+    """Monta o HTML completo; (preset, seção) em paralelo no pool de processos."""
+    file_path = file_path or data_path()
+    periods = resolve_presets(data_anchor(load_broker_data(file_path)["date"]))
+    tasks = [(preset, section, periods[preset]) for preset in PERIOD_PRESETS for section in REPORT_SECTIONS]
+
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1:
+        _init_worker(file_path, dark)
+        results = [render_block(*t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(file_path, dark)) as pool:
+            results = list(pool.map(render_block, *zip(*tasks)))
+    blocks = {(preset, section): body for preset, section, body, _ in results}
+
+    generated = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")
+    nav = "".join(f'<a href="#p{i}">{html.escape(p)}</a>' for i, p in enumerate(PERIOD_PRESETS))
+    parts = []
+    for i, preset in enumerate(PERIOD_PRESETS):
+        per = periods[preset]
+        parts.append(
+            f'<h2 id="p{i}">{html.escape(preset)} '
+            f'<span class="period">{per["start"]:%Y-%m-%d} → {per["end"]:%Y-%m-%d} '
+            f'(vs {per["prev_start"]:%Y-%m-%d} → {per["prev_end"]:%Y-%m-%d})</span></h2>'
+        )
+        for section in REPORT_SECTIONS:
+            parts.append(f"<h3>{html.escape(section)}</h3>{blocks[(preset, section)]}")
+
+    colors = {"bg": "#0E1333", "fg": "#FFFFFF", "line": "rgba(255,255,255,0.15)"} if dark \
+        else {"bg": "#FFFFFF", "fg": "#17193B", "line": "rgba(23,25,59,0.15)"}
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+        "<title>Broker Trading Barometer – Report</title>"
+        f"<style>{_CSS % colors}</style>"
+        f'<script type="text/javascript">{get_plotlyjs()}</script></head><body>'
+        f"<header><h1>Broker Trading Barometer</h1><p>Generated {generated}</p></header>"
+        f"<nav>{nav}</nav><main>{''.join(parts)}</main></body></html>"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Static HTML report for every period preset")
+    parser.add_argument("--out", default=os.path.join("reports", f"barometer_{pd.Timestamp.today():%Y-%m-%d}.html"))
+    parser.add_argument("--data", default=None, help="CSV da base (padrão: BROKER_DATA_PATH ou data/)")
+    parser.add_argument("--workers", type=int, default=None, help="processos do pool (padrão: nº de CPUs)")
+    parser.add_argument("--dark", action="store_true", help="tema escuro (padrão: claro, melhor para e-mail)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    report = build_report(args.data, args.workers, args.dark)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write(report)
+    print(f"{args.out}: {len(report) / 1e6:.1f} MB in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
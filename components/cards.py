@@ -15,6 +15,8 @@ def _format_value(fmt: str, value):
             return f"{int(round(value)):,}"
         except Exception:
             return f"{value}"
+    if fmt == "float2":
+        return f"{float(value):,.2f}"
     if fmt == "float4":
         return f"{float(value):,.4f}"
     if fmt == "pct":
@@ -27,6 +29,24 @@ def _format_delta(current, previous):
     delta = calculate_variation(current, previous)
     return f"{delta:+.2f}%"
 
+def _sparkline_svg(values, color: str = "#29b5e8", width: int = 160, height: int = 32) -> str | None:
+    """Sparkline leve em SVG inline (sem Plotly) para o rodapé do card."""
+    if values is None:
+        return None
+    ys = [float(v) for v in values if v is not None and not math.isnan(float(v))]
+    if len(ys) < 2:
+        return None
+    lo, hi = min(ys), max(ys)
+    span = (hi - lo) or 1.0
+    step = width / (len(ys) - 1)
+    points = " ".join(
+        f"{i * step:.1f},{height - 2 - (y - lo) / span * (height - 4):.1f}" for i, y in enumerate(ys)
+    )
+    return (
+        f'<svg width="100%" height="{height}" viewBox="0 0 {width} {height}" preserveAspectRatio="none">'
+        f'<polyline fill="none" stroke="{color}" stroke-width="1.5" points="{points}" /></svg>'
+    )
+
 def render_metric_cards(
     metrics: Iterable[Mapping[str, Any]],
     cols_per_row: int = 4,
@@ -38,6 +58,7 @@ def render_metric_cards(
     metrics: Iterable de dicts gerados por compute_metrics()
     cols_per_row: número de colunas por linha
     title: título opcional a ser renderizado acima dos cards
+    Quando o dict traz "trend" (série do build_trend_frame), desenha uma sparkline abaixo do card.
     """
     metrics = list(metrics)
 
@@ -75,5 +96,8 @@ def render_metric_cards(
                     delta_color=delta_color,
                     help=help_text if help_text else None
                 )
+                spark = _sparkline_svg(m.get("trend"))
+                if spark:
+                    st.markdown(spark, unsafe_allow_html=True)
 
             idx += 1
\ No newline at end of file
@@ -0,0 +1,74 @@
+# components/concentration.py
+from __future__ import annotations
+import pandas as pd
+import streamlit as st
+import plotly.graph_objects as go
+
+from utils.concentration import concentration_series, window_concentration
+from .cards import render_metric_cards
+
+_WINDOWS = {"Daily": 1, "5 days": 5, "20 days": 20, "60 days": 60}
+_SERIES = {
+    "HHI": "hhi",
+    "Top-1 share": "top1",
+    "Top-5 share": "top5",
+    "Top-10 share": "top10",
+    "Effective # brokers": "eff_n",
+}
+
+
+@st.cache_data(show_spinner=False)
+def _series(data_version: str | None, window: int, _df: pd.DataFrame) -> pd.DataFrame:
+    """Série de concentração do histórico inteiro, em cache por versão da base e janela."""
+    return concentration_series(_df, window=window)
+
+
+def _cards(cur: dict, prev: dict | None) -> list[dict]:
+    prev = prev or {}
+    cards = []
+    for side, label in (("buy", "Buy"), ("sell", "Sell")):
+        cards += [
+            {"label": f"{label} HHI", "current": cur[f"{side}_hhi"], "previous": prev.get(f"{side}_hhi"),
+             "fmt": "float4", "delta_color": "inverse", "help": "Herfindahl index: Σ share² (0–1)"},
+            {"label": f"{label} Top-1 Share", "current": cur[f"{side}_top1"] * 100,
+             "previous": prev.get(f"{side}_top1", 0) * 100, "fmt": "pct", "delta_color": "inverse", "help": None},
+            {"label": f"{label} Top-5 Share", "current": cur[f"{side}_top5"] * 100,
+             "previous": prev.get(f"{side}_top5", 0) * 100, "fmt": "pct", "delta_color": "inverse", "help": None},
+            {"label": f"{label} Effective Brokers", "current": cur[f"{side}_eff_n"],
+             "previous": prev.get(f"{side}_eff_n"), "fmt": "float2", "delta_color": "normal",
+             "help": "1 / HHI"},
+        ]
+    return cards
+
+
+def render_concentration(df: pd.DataFrame, cur_df: pd.DataFrame, prev_df: pd.DataFrame | None = None) -> None:
+    """Concentração do fluxo de compra/venda: cards do período + série móvel do histórico."""
+    if cur_df is None or cur_df.empty:
+        st.info("No data in the selected period.")
+        return
+
+    cur = window_concentration(cur_df)
+    prev = window_concentration(prev_df) if (prev_df is not None and not prev_df.empty) else None
+    render_metric_cards(_cards(cur, prev), cols_per_row=4, title="Flow Concentration")
+
+    st.markdown("#### Concentration over Time")
+    c1, c2 = st.columns(2)
+    with c1:
+        win_label = st.radio("Rolling window", list(_WINDOWS), index=2, horizontal=True, key="conc_window")
+    with c2:
+        stat_label = st.selectbox("Measure", list(_SERIES), index=0, key="conc_measure")
+
+    series = _series(df.attrs.get("data_version"), _WINDOWS[win_label], df)
+    stat = _SERIES[stat_label]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=series.index, y=series[f"buy_{stat}"], mode="lines",
+                             name="Buy", line=dict(color="#2ecc71", width=2)))
+    fig.add_trace(go.Scatter(x=series.index, y=series[f"sell_{stat}"], mode="lines",
+                             name="Sell", line=dict(color="#e74c3c", width=2)))
+    dates = pd.to_datetime(cur_df["date"])
+    fig.add_vrect(x0=dates.min(), x1=dates.max(), fillcolor="rgba(41,181,232,0.10)", line_width=0)
+    fig.update_layout(height=340, margin=dict(l=10, r=10, t=30, b=30),
+                      xaxis_title="Date", yaxis_title=stat_label,
+                      legend=dict(orientation="h", y=1.08))
+    st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,49 @@
+# components/data_quality.py
+from __future__ import annotations
+import json
+import pandas as pd
+import streamlit as st
+
+from utils.reconciliation import CHECKS, reconcile_balances, reconciliation_report
+
+
+@st.cache_data(show_spinner=False)
+def _issues(data_version: str | None, tolerance: float, _df: pd.DataFrame) -> pd.DataFrame:
+    """Reconciliação da base inteira, refeita só quando a versão dos dados muda."""
+    return reconcile_balances(_df, tolerance=tolerance)
+
+
+def render_data_quality(df: pd.DataFrame, tolerance: float = 0.0) -> None:
+    """Reconciliação de saldos: contagem por checagem, ranking por broker e relatório JSON."""
+    if df is None or df.empty:
+        st.info("No data available.")
+        return
+
+    issues = _issues(df.attrs.get("data_version"), tolerance, df)
+    report = reconciliation_report(df, issues=issues, tolerance=tolerance)
+
+    st.markdown("#### Balance Reconciliation")
+    cols = st.columns(len(CHECKS))
+    for c, (name, desc) in zip(cols, CHECKS.items()):
+        with c:
+            st.metric(name.replace("_", " ").title(), f"{report['checks'][name]['issues']:,}", help=desc)
+
+    st.caption(f"{report['rows_checked']:,} rows · {report['brokers_checked']:,} brokers checked "
+               f"(tolerance {tolerance:g}).")
+
+    if issues.empty:
+        st.success("All broker histories reconcile.")
+        return
+
+    st.markdown("#### Issues by Broker")
+    per_broker = (issues.groupby(["broker", "check"]).size().unstack(fill_value=0)
+                        .assign(total=lambda t: t.sum(axis=1))
+                        .sort_values("total", ascending=False))
+    st.dataframe(per_broker, use_container_width=True)
+
+    st.download_button(
+        "Download reconciliation report (JSON)",
+        data=json.dumps(report, indent=2),
+        file_name="reconciliation_report.json",
+        mime="application/json",
+    )
@@ -0,0 +1,103 @@
+# components/efficiency.py
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import streamlit as st
+import plotly.graph_objects as go
+
+from utils.quantile_sketch import get_efficiency_index
+from .cards import render_metric_cards
+from .metrics import calculate_variation
+from .paginated_table import render_paginated_table
+
+_QUANTILES = {"P10": 0.1, "P25": 0.25, "Median": 0.5, "P75": 0.75, "P90": 0.9}
+
+
+def _window(frame: pd.DataFrame | None):
+    if frame is None or frame.empty:
+        return None, None
+    dates = pd.to_datetime(frame["date"])
+    return dates.min(), dates.max()
+
+
+def efficiency_leaderboard(index, cur_window, prev_window) -> pd.DataFrame:
+    """Leaderboard da janela atual com percentil/rank da anterior e variação (calculate_variation)."""
+    cur = index.leaderboard(*cur_window)
+    if prev_window[0] is None:
+        prev = pd.DataFrame(columns=["broker", "percentile", "rank"])
+    else:
+        prev = index.leaderboard(*prev_window)
+    prev = prev[["broker", "percentile", "rank"]].rename(columns={"percentile": "prev_percentile",
+                                                                  "rank": "prev_rank"})
+    out = cur.merge(prev, on="broker", how="left")
+    out["percentile_change"] = [
+        calculate_variation(c, p) if pd.notna(p) else np.nan
+        for c, p in zip(out["percentile"], out["prev_percentile"])
+    ]
+    out["rank_change"] = out["prev_rank"] - out["rank"]  # positivo = subiu no ranking
+    return out
+
+
+def _cards(index, cur_window, prev_window) -> list[dict]:
+    qs = tuple(_QUANTILES.values())
+    cur = index.quantiles(qs, *cur_window)
+    prev = index.quantiles(qs, *prev_window) if prev_window[0] is not None else {}
+    cards = [
+        {"label": f"{label} Efficiency", "current": cur[q], "previous": prev.get(q), "fmt": "float4",
+         "delta_color": "normal", "help": f"Volume-weighted {label.lower()} of efficiency_score"}
+        for label, q in _QUANTILES.items() if label in ("P10", "Median", "P90")
+    ]
+    cards.append({"label": "Efficiency IQR", "current": cur[0.75] - cur[0.25],
+                  "previous": (prev[0.75] - prev[0.25]) if prev else None, "fmt": "float4",
+                  "delta_color": "inverse", "help": "P75 − P25 (dispersion across broker-days)"})
+    return cards
+
+
+def _leaderboard_figure(lb: pd.DataFrame, top_n: int) -> go.Figure:
+    top = lb.head(top_n).iloc[::-1]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=top["percentile"], y=top["broker"], orientation="h", name="Current",
+                         marker=dict(color="#29b5e8"), text=top["percentile"].map(lambda v: f"{v:.0f}"),
+                         textposition="outside"))
+    fig.add_trace(go.Scatter(x=top["prev_percentile"], y=top["broker"], mode="markers", name="Previous",
+                             marker=dict(symbol="line-ns-open", size=16, line=dict(width=3), color="#FF9F36")))
+    fig.update_layout(title=f"Top {len(top)} Brokers by Efficiency Percentile",
+                      height=max(280, 30 * len(top)), margin=dict(l=10, r=20, t=40, b=10),
+                      xaxis=dict(title="Percentile (volume-weighted)", range=[0, 105]), yaxis_title=None,
+                      legend=dict(orientation="h", y=1.08))
+    return fig
+
+
+def render_efficiency(df: pd.DataFrame, cur_df: pd.DataFrame, prev_df: pd.DataFrame | None = None,
+                      top_n: int = 10) -> None:
+    """
+    Leaderboard de efficiency_score por percentil ponderado por volume.
+    Quantis dos cards vêm da fusão dos t-digests diários (utils.quantile_sketch), sem ordenar os
+    scores brutos; percentis do leaderboard comparam os scores de janela dos brokers entre si.
+    """
+    if cur_df is None or cur_df.empty:
+        st.info("No data in the selected period.")
+        return
+    if "efficiency_score" not in df.columns:
+        st.warning("Missing column 'efficiency_score'.")
+        return
+
+    index = get_efficiency_index(df)
+    cur_window, prev_window = _window(cur_df), _window(prev_df)
+    render_metric_cards(_cards(index, cur_window, prev_window), cols_per_row=4, title="Efficiency")
+
+    lb = efficiency_leaderboard(index, cur_window, prev_window)
+    st.plotly_chart(_leaderboard_figure(lb, top_n), use_container_width=True)
+
+    st.markdown("#### Efficiency Leaderboard")
+    st.caption("Efficiency = volume-weighted mean of the broker's daily scores in the period. "
+               "Percentile = share of the period's broker volume held by brokers with a lower efficiency "
+               "(ties count half).")
+    render_paginated_table(
+        lb[["rank", "broker", "efficiency", "percentile", "prev_percentile", "percentile_change",
+            "rank_change", "volume"]],
+        key="eff_lb",
+        cache_key=(df.attrs.get("data_version"), cur_window, prev_window),
+        page_size=25,
+        default_sort=[("rank", True)],
+    )
@@ -4,6 +4,19 @@ import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.express as px
+import plotly.graph_objects as go
+
+from utils.distinct_sketch import get_distinct_counter
+from utils.profile_flow import ProfileFlow, decompose_change
+
+_FLOW_MEASURES = {"Net flow": "net", "Buy volume": "buy", "Sell volume": "sell"}
+_CHANGE_MEASURES = {"Gross volume (buy + sell)": "gross", "Buy volume": "buy", "Sell volume": "sell"}
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _profile_flow(data_version: str | None, _df: pd.DataFrame) -> ProfileFlow:
+    """Matrizes profile × pregão do histórico, montadas uma vez por versão da base (não mutar)."""
+    return ProfileFlow(_df)
 
 # --- helpers ---
 def _to_num(s: pd.Series) -> pd.Series:
@@ -46,7 +59,8 @@ def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
 
     return data
 
-def _aggregate(df: pd.DataFrame) -> dict:
+def _aggregate(df: pd.DataFrame, distinct_counter=None) -> dict:
+    """distinct_counter: DistinctCounter da base completa para contar brokers sem varrer df."""
     total_buy  = float(np.nansum(df["buy_volume"]))  if "buy_volume"  in df.columns else float("nan")
     total_sell = float(np.nansum(df["sell_volume"])) if "sell_volume" in df.columns else float("nan")
 
@@ -73,7 +87,12 @@ def _aggregate(df: pd.DataFrame) -> dict:
 
     # número de brokers/investors distintos (aceita 'broker' ou 'investor')
     ent_col = "broker" if "broker" in df.columns else ("investor" if "investor" in df.columns else None)
-    n_entities = int(df[ent_col].nunique()) if ent_col else 0
+    if ent_col is None:
+        n_entities = 0
+    elif distinct_counter is not None and distinct_counter.col == ent_col:
+        n_entities = distinct_counter.count_frame(df)
+    else:
+        n_entities = int(df[ent_col].nunique())
 
     return {
         "total_buy": total_buy,
@@ -85,9 +104,93 @@ def _aggregate(df: pd.DataFrame) -> dict:
         "n_entities": n_entities,
     }
 
-def render_general_profile(cur_df: pd.DataFrame, prev_df: pd.DataFrame | None = None) -> None:
+def _profile_pie(cur: pd.DataFrame) -> go.Figure:
+    """Pizza de buy volume por profile (cur já normalizado)."""
+    df_profile = (cur.groupby("profile", as_index=False)["buy_volume"].sum()
+                     .rename(columns={"buy_volume": "total_buy_volume"}))
+    fig_pie = px.pie(
+        df_profile,
+        names="profile",
+        values="total_buy_volume",
+        title="Buy Volume by Investor Profile",
+        color_discrete_sequence=px.colors.qualitative.Set3,
+        hole=0.4
+    )
+    fig_pie.update_layout(margin=dict(t=20, b=0, l=0, r=0), height=280)
+    return fig_pie
+
+
+def _change_figure(dec: pd.DataFrame, label: str) -> go.Figure:
+    """Barras empilhadas efeito volume + efeito mix por profile, com a variação total."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=dec["profile"], y=dec["volume_effect"], name="Volume effect", marker_color="#29b5e8"))
+    fig.add_trace(go.Bar(x=dec["profile"], y=dec["mix_effect"], name="Mix effect", marker_color="#f39c12"))
+    fig.add_trace(go.Scatter(x=dec["profile"], y=dec["change"], mode="markers", name="Total change",
+                             marker=dict(symbol="diamond", size=11, color="#2c3e50")))
+    fig.update_layout(barmode="relative", height=320, margin=dict(l=10, r=10, t=30, b=30),
+                      yaxis_title=f"Δ {label}", legend=dict(orientation="h", y=1.1))
+    return fig
+
+
+def _window(frame: pd.DataFrame | None):
+    if frame is None or frame.empty:
+        return None
+    dates = pd.to_datetime(frame["date"])
+    return dates.min(), dates.max()
+
+
+def _render_weekly_flow(flow: ProfileFlow, cur_window) -> None:
+    st.markdown("#### Weekly Flow by Profile")
+    label = st.radio("Measure", list(_FLOW_MEASURES), index=0, horizontal=True, key="gp_flow_measure")
+    weekly = flow.weekly()
+    measure = _FLOW_MEASURES[label]
+
+    fig = go.Figure()
+    for profile, g in weekly.groupby("profile", sort=False):
+        fig.add_trace(go.Scatter(x=g["week_start"], y=g[measure], mode="lines", name=str(profile)))
+    if cur_window is not None:
+        fig.add_vrect(x0=cur_window[0], x1=cur_window[1], fillcolor="rgba(41,181,232,0.10)", line_width=0)
+    if measure == "net":
+        fig.add_hline(y=0, line=dict(color="rgba(127,127,127,0.6)", width=1))
+    fig.update_layout(height=340, margin=dict(l=10, r=10, t=30, b=30),
+                      xaxis_title="Week", yaxis_title=label, legend=dict(orientation="h", y=1.08))
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def _render_change_decomposition(flow: ProfileFlow, cur_window, prev_window) -> None:
+    st.markdown("#### Change vs Previous Period")
+    if cur_window is None or prev_window is None:
+        st.info("No previous period to compare with.")
+        return
+    label = st.selectbox("Measure", list(_CHANGE_MEASURES), index=0, key="gp_change_measure")
+    dec = decompose_change(flow.totals(*prev_window), flow.totals(*cur_window), _CHANGE_MEASURES[label])
+    st.caption("Volume effect: change explained by total market volume at the previous mix. "
+               "Mix effect: change explained by the profile gaining or losing share.")
+
+    fig = _change_figure(dec, label)
+    st.plotly_chart(fig, use_container_width=True)
+
+    table = dec.assign(prev_share=dec["prev_share"] * 100, cur_share=dec["cur_share"] * 100)
+    st.dataframe(
+        table, hide_index=True, use_container_width=True,
+        column_config={
+            "previous": st.column_config.NumberColumn("Previous", format="%,.0f"),
+            "current": st.column_config.NumberColumn("Current", format="%,.0f"),
+            "change": st.column_config.NumberColumn("Change", format="%+,.0f"),
+            "volume_effect": st.column_config.NumberColumn("Volume effect", format="%+,.0f"),
+            "mix_effect": st.column_config.NumberColumn("Mix effect", format="%+,.0f"),
+            "prev_share": st.column_config.NumberColumn("Prev. share", format="%.1f%%"),
+            "cur_share": st.column_config.NumberColumn("Share", format="%.1f%%"),
+        },
+    )
+
+
+def render_general_profile(cur_df: pd.DataFrame, prev_df: pd.DataFrame | None = None,
+                           df: pd.DataFrame | None = None) -> None:
     """
-    General Profile: cards de resumo + pizza de 'Buy Volume by Profile'.
+    General Profile: cards de resumo + pizza de 'Buy Volume by Profile'
+    + fluxo semanal por profile e decomposição volume/mix da variação vs período anterior.
+    df: base completa (histórico); sem ela, usa só cur_df + prev_df.
     Lê colunas: date, broker/investor, buy_volume, sell_volume, buy_vwap, sell_vwap, profile,
                 anon_volume (opcional) e/ou anonymous (opcional).
     """
@@ -98,8 +201,9 @@ def render_general_profile(cur_df: pd.DataFrame, prev_df: pd.DataFrame | None =
     cur = _normalize_columns(cur_df)
     prev = _normalize_columns(prev_df) if (prev_df is not None and not prev_df.empty) else None
 
-    cur_agg  = _aggregate(cur)
-    prev_agg = _aggregate(prev) if prev is not None else None
+    counter = get_distinct_counter(df) if df is not None else None
+    cur_agg  = _aggregate(cur, counter)
+    prev_agg = _aggregate(prev, counter) if prev is not None else None
 
     # === CARDS ===
     st.markdown("#### General Profile")
@@ -125,17 +229,14 @@ def render_general_profile(cur_df: pd.DataFrame, prev_df: pd.DataFrame | None =
     # === PIE: Buy Volume by Profile ===
     st.markdown("#### Distribution of Investor Profiles by Buy Volume")
     if "buy_volume" in cur.columns and "profile" in cur.columns:
-        df_profile = (cur.groupby("profile", as_index=False)["buy_volume"].sum()
-                         .rename(columns={"buy_volume": "total_buy_volume"}))
-        fig_pie = px.pie(
-            df_profile,
-            names="profile",
-            values="total_buy_volume",
-            title="Buy Volume by Investor Profile",
-            color_discrete_sequence=px.colors.qualitative.Set3,
-            hole=0.4
-        )
-        fig_pie.update_layout(margin=dict(t=20, b=0, l=0, r=0), height=280)
+        fig_pie = _profile_pie(cur)
         st.plotly_chart(fig_pie, use_container_width=True)
     else:
         st.warning("Missing columns for the pie chart (need 'profile' and 'buy_volume').")
+
+    if df is not None and df.attrs.get("data_version") is not None:
+        flow = _profile_flow(df.attrs["data_version"], df)
+    else:
+        flow = ProfileFlow(df if df is not None else pd.concat([f for f in (prev_df, cur_df) if f is not None]))
+    _render_weekly_flow(flow, _window(cur_df))
+    _render_change_decomposition(flow, _window(cur_df), _window(prev_df))
@@ -1,5 +1,6 @@
 import os
 import base64
+from functools import lru_cache
 import streamlit as st
 
 # --- Design tokens ---
@@ -10,9 +11,10 @@ WHITE = "#FFFFFF"         # fundo do app
 MUTED = "#C9D1E9"         # subtítulo claro
 
 
-def set_global_styles():
-    """Estilos globais e da sidebar."""
-    st.markdown(f"""
+@lru_cache(maxsize=1)
+def _global_css() -> str:
+    """CSS global montado uma única vez por processo."""
+    return f"""
     <style>
       /* === SIDEBAR === */
       section[data-testid="stSidebar"] {{
@@ -64,7 +66,20 @@ def set_global_styles():
         color: {TEXT};
       }}
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+def set_global_styles():
+    """Estilos globais e da sidebar."""
+    st.markdown(_global_css(), unsafe_allow_html=True)
+
+@lru_cache(maxsize=8)
+def _encode_logo(logo_path: str, mtime_ns: int) -> str | None:
+    """Logo em base64, codificado uma vez por arquivo/versão (mtime na chave)."""
+    try:
+        with open(logo_path, "rb") as f:
+            return base64.b64encode(f.read()).decode()
+    except Exception:
+        return None
 
 def render_sidebar_brand(
     title: str = "Broker Trading Barometer",
@@ -74,11 +89,7 @@ def render_sidebar_brand(
     """Renderiza o brand fixo no topo da sidebar."""
     encoded = None
     if logo_path and os.path.exists(logo_path):
-        try:
-            with open(logo_path, "rb") as f:
-                encoded = base64.b64encode(f.read()).decode()
-        except Exception:
-            encoded = None
+        encoded = _encode_logo(logo_path, os.stat(logo_path).st_mtime_ns)
 
     st.sidebar.markdown(
         f"""
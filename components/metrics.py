@@ -18,16 +18,68 @@ def _sir(df: pd.DataFrame) -> float:
     eb = _safe_sum(df.get("end_balance",   pd.Series(dtype=float)))
     return float(si / eb) if eb else 0.0
 
-def compute_metrics(cur_df: pd.DataFrame, prev_df: pd.DataFrame, grouped_df: pd.DataFrame | None = None):
+def build_trend_frame(df: pd.DataFrame, freq: str = "auto", max_daily_points: int = 31) -> pd.DataFrame:
+    """
+    Série de tendência das oito métricas dos cards em UMA passada de groupby.
+    freq: "D" (por dia), "W" (por semana) ou "auto" (diário até max_daily_points pregões).
+    Retorna um DataFrame indexado pelo início do bucket com: buy_volume, sell_volume,
+    buy_vwap, sell_vwap, brokers, start_balance, end_balance, sir.
+    """
+    if df is None or df.empty or "date" not in df.columns:
+        return pd.DataFrame()
+
+    dates = pd.to_datetime(df["date"]).dt.normalize()
+    if freq == "auto":
+        freq = "D" if dates.nunique() <= max_daily_points else "W"
+    if freq == "D":
+        bucket = dates
+    elif "week_id" in df.columns:  # código inteiro do calendário (ingestão)
+        bucket = df["week_id"]
+    else:
+        bucket = dates - pd.to_timedelta(dates.dt.weekday, unit="D")
+
+    spec = {
+        "buy_volume": "sum", "sell_volume": "sum",
+        "buy_vwap": "mean", "sell_vwap": "mean",
+        "broker": "nunique",
+        "start_balance": "sum", "end_balance": "sum", "short_interest": "sum",
+    }
+    spec = {c: f for c, f in spec.items() if c in df.columns}
+    data = df[list(spec)].copy()
+    for c in spec:
+        if c != "broker":
+            data[c] = pd.to_numeric(data[c], errors="coerce")
+    data["first_date"] = dates
+    spec["first_date"] = "min"
+
+    grouped = data.groupby(bucket.rename("bucket").to_numpy()).agg(spec).rename(columns={"broker": "brokers"})
+    first = grouped.pop("first_date")
+    grouped.index = first if freq == "D" else first - pd.to_timedelta(first.dt.weekday, unit="D")
+    grouped.index.name = "bucket"
+    if {"short_interest", "end_balance"}.issubset(grouped.columns):
+        eb = grouped["end_balance"].where(grouped["end_balance"] != 0)
+        grouped["sir"] = (grouped["short_interest"] / eb).fillna(0.0)
+    return grouped
+
+def _distinct_brokers(df: pd.DataFrame, distinct_counter=None) -> int:
+    if "broker" not in df.columns:
+        return 0
+    if distinct_counter is not None:
+        return distinct_counter.count_frame(df)
+    return int(df["broker"].nunique())
+
+def compute_metrics(cur_df: pd.DataFrame, prev_df: pd.DataFrame, grouped_df: pd.DataFrame | None = None,
+                    distinct_counter=None):
     """
     Calcula métricas conforme solicitado:
       - Buy/Sell Volume: soma
       - VWAP Buy / VWAP Sell: média
-      - Total Brokers: nunique
+      - Total Brokers: nunique (ou DistinctCounter da base, sem varrer as linhas do período)
       - Start/End Balance: soma
       - Short Interest Ratio: sum(short_interest) / sum(end_balance)
       - (Opcional) Total Volume: buy+sell
     grouped_df: dataframe agregado (ex.: por dia/semana) para série de tendência (opcional)
+    distinct_counter: utils.distinct_sketch.DistinctCounter da base completa (opcional)
     Retorna lista de dicionários: {label, current, previous, fmt, delta_color, help, trend?}
     """
     # ---- atuais
@@ -38,7 +90,7 @@ def compute_metrics(cur_df: pd.DataFrame, prev_df: pd.DataFrame, grouped_df: pd.
     cur_vwap_buy  = _safe_mean(cur_df.get("buy_vwap",  pd.Series(dtype=float)))
     cur_vwap_sell = _safe_mean(cur_df.get("sell_vwap", pd.Series(dtype=float)))
 
-    cur_brok = int(cur_df["broker"].nunique()) if "broker" in cur_df.columns else 0
+    cur_brok = _distinct_brokers(cur_df, distinct_counter)
     cur_sb   = _safe_sum(cur_df.get("start_balance", pd.Series(dtype=float)))
     cur_eb   = _safe_sum(cur_df.get("end_balance",   pd.Series(dtype=float)))
     cur_sir  = _sir(cur_df)
@@ -51,7 +103,7 @@ def compute_metrics(cur_df: pd.DataFrame, prev_df: pd.DataFrame, grouped_df: pd.
     prev_vwap_buy  = _safe_mean(prev_df.get("buy_vwap",  pd.Series(dtype=float)))
     prev_vwap_sell = _safe_mean(prev_df.get("sell_vwap", pd.Series(dtype=float)))
 
-    prev_brok = int(prev_df["broker"].nunique()) if "broker" in prev_df.columns else 0
+    prev_brok = _distinct_brokers(prev_df, distinct_counter)
     prev_sb   = _safe_sum(prev_df.get("start_balance", pd.Series(dtype=float)))
     prev_eb   = _safe_sum(prev_df.get("end_balance",   pd.Series(dtype=float)))
     prev_sir  = _sir(prev_df)
@@ -64,6 +116,7 @@ def compute_metrics(cur_df: pd.DataFrame, prev_df: pd.DataFrame, grouped_df: pd.
     trend_sb    = grouped_df["start_balance"]if (grouped_df is not None and "start_balance"in grouped_df.columns) else None
     trend_eb    = grouped_df["end_balance"]  if (grouped_df is not None and "end_balance"  in grouped_df.columns) else None
     trend_sir   = grouped_df["sir"]          if (grouped_df is not None and "sir"          in grouped_df.columns) else None
+    trend_brok  = grouped_df["brokers"]      if (grouped_df is not None and "brokers"      in grouped_df.columns) else None
     trend_vol   = grouped_df["buy_volume"] + grouped_df["sell_volume"] if (grouped_df is not None and {"buy_volume","sell_volume"}.issubset(grouped_df.columns)) else None
 
     metrics = [
@@ -74,7 +127,7 @@ def compute_metrics(cur_df: pd.DataFrame, prev_df: pd.DataFrame, grouped_df: pd.
         {"label": "VWAP Buy",       "current": cur_vwap_buy,  "previous": prev_vwap_buy,  "fmt": "float4", "delta_color": "normal",  "help": None, "trend": trend_vb},
         {"label": "VWAP Sell",      "current": cur_vwap_sell, "previous": prev_vwap_sell, "fmt": "float4", "delta_color": "normal",  "help": None, "trend": trend_vs},
 
-        {"label": "Total Brokers",  "current": cur_brok,  "previous": prev_brok,  "fmt": "int",    "delta_color": "normal",  "help": "Distinct brokers", "trend": None},
+        {"label": "Total Brokers",  "current": cur_brok,  "previous": prev_brok,  "fmt": "int",    "delta_color": "normal",  "help": "Distinct brokers", "trend": trend_brok},
 
         {"label": "Start Balance",  "current": cur_sb,    "previous": prev_sb,    "fmt": "int",    "delta_color": "normal",  "help": None, "trend": trend_sb},
         {"label": "End Balance",    "current": cur_eb,    "previous": prev_eb,    "fmt": "int",    "delta_color": "normal",  "help": None, "trend": trend_eb},
@@ -0,0 +1,83 @@
+# components/net_flow_heatmap.py
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import streamlit as st
+import plotly.express as px
+
+from utils.top_invest import weekly_net_flow_matrix, order_flow_rows
+
+# paleta divergente: vendedor (vermelho) -> neutro -> comprador (verde)
+_NEG = np.array([231, 76, 60], dtype=np.float64)
+_MID = np.array([244, 246, 251], dtype=np.float64)
+_POS = np.array([46, 204, 113], dtype=np.float64)
+
+# hover por célula só em matrizes pequenas (o texto cresce com top-K × semanas)
+HOVER_MAX_CELLS = 5_000
+
+
+@st.cache_data(show_spinner=False)
+def _flow_matrix(data_version: str | None, _df: pd.DataFrame):
+    """Matriz broker × semana da base inteira, calculada uma vez por versão de dados."""
+    return weekly_net_flow_matrix(_df)
+
+
+def _to_rgb(values: np.ndarray, clip_quantile: float = 0.99) -> np.ndarray:
+    """Mapeia net flow para RGB (escala simétrica, robusta a outliers)."""
+    scale = np.quantile(np.abs(values), clip_quantile) if values.size else 0.0
+    scale = scale if scale > 0 else 1.0
+    t = np.clip(values / scale, -1.0, 1.0)[..., None]
+    rgb = np.where(t >= 0, _MID + t * (_POS - _MID), _MID - t * (_NEG - _MID))
+    return rgb.astype(np.uint8)
+
+
+def _tick_positions(n: int, max_ticks: int) -> np.ndarray:
+    step = max(1, int(np.ceil(n / max_ticks)))
+    return np.arange(0, n, step)
+
+
+def render_net_flow_heatmap(df: pd.DataFrame) -> None:
+    """
+    Heatmap de net flow (buy - sell) por broker × semana em todo o histórico.
+    Renderizado como imagem (PNG no servidor): o payload depende só de top-K × semanas,
+    não do número de brokers. Hover por célula só até HOVER_MAX_CELLS células.
+    """
+    if df is None or df.empty:
+        st.info("No data available.")
+        return
+
+    st.markdown("#### Net Flow by Broker and Week")
+    c1, c2 = st.columns([2, 1])
+    with c1:
+        order = st.radio("Row order", ["Total net flow", "Similarity (clustered)"],
+                         horizontal=True, key="nfh_order")
+    with c2:
+        top_k = st.number_input("Max brokers", min_value=5, max_value=500, value=50, step=5, key="nfh_top_k")
+
+    matrix, brokers, week_starts = _flow_matrix(df.attrs.get("data_version"), df)
+    if matrix.size == 0:
+        st.info("No data available.")
+        return
+
+    rows = order_flow_rows(matrix, order="cluster" if order.startswith("Similarity") else "total",
+                           top_k=int(top_k))
+    sub = matrix[rows]
+
+    fig = px.imshow(_to_rgb(sub), binary_string=True, aspect="auto")
+    week_labels = [f"{pd.Timestamp(w):%Y-%m-%d}" for w in week_starts]
+    broker_labels = [str(b) for b in brokers[rows]]
+    xt = _tick_positions(len(week_labels), 14)
+    yt = _tick_positions(len(broker_labels), 60)
+    fig.update_xaxes(tickvals=xt, ticktext=[week_labels[i] for i in xt], title="Week")
+    fig.update_yaxes(tickvals=yt, ticktext=[broker_labels[i] for i in yt], title=None)
+    if sub.size <= HOVER_MAX_CELLS:
+        hover = [[f"{b}<br>Week of {w}<br>Net flow: {v:,.0f}" for w, v in zip(week_labels, row)]
+                 for b, row in zip(broker_labels, sub)]
+        fig.update_traces(hovertext=hover, hovertemplate="%{hovertext}<extra></extra>")
+    else:
+        fig.update_traces(hoverinfo="skip", hovertemplate=None)
+    fig.update_layout(height=max(320, min(14 * len(rows), 900)), margin=dict(l=10, r=10, t=20, b=30))
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.caption(f"Showing {len(rows)} of {len(brokers)} brokers × {len(week_starts)} weeks · "
+               "green = net buyer, red = net seller (color scale clipped at the 99th percentile).")
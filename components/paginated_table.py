@@ -0,0 +1,101 @@
+# components/paginated_table.py
+from __future__ import annotations
+import math
+from typing import Hashable, Sequence
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+def _rank_codes(s: pd.Series) -> tuple[np.ndarray, int]:
+    """Códigos densos ordenados (0..k-1) da coluna; NaN recebe k (sempre por último)."""
+    codes, uniques = pd.factorize(s, sort=True)
+    k = len(uniques)
+    return np.where(codes < 0, k, codes), k
+
+
+class _SortIndex:
+    """Ordens de linhas pré-computadas por (coluna, direção), calculadas uma vez e reaproveitadas."""
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+        self._ranks: dict[str, tuple[np.ndarray, int]] = {}
+        self._orders: dict[tuple, np.ndarray] = {}
+
+    def _rank(self, col: str) -> tuple[np.ndarray, int]:
+        if col not in self._ranks:
+            self._ranks[col] = _rank_codes(self._df[col])
+        return self._ranks[col]
+
+    def order(self, keys: Sequence[tuple[str, bool]]) -> np.ndarray:
+        keys = tuple(keys)
+        if keys not in self._orders:
+            if not keys:
+                self._orders[keys] = np.arange(len(self._df))
+            else:
+                sort_keys = []
+                for col, asc in keys:
+                    ranks, k = self._rank(col)
+                    sort_keys.append(ranks if asc else np.where(ranks == k, k, (k - 1) - ranks))
+                # lexsort: a última chave é a primária
+                self._orders[keys] = np.lexsort(sort_keys[::-1])
+        return self._orders[keys]
+
+
+def render_paginated_table(
+    df: pd.DataFrame,
+    key: str,
+    cache_key: Hashable = None,
+    page_size: int = 25,
+    default_sort: Sequence[tuple[str, bool]] | None = None,
+    sortable: Sequence[str] | None = None,
+) -> None:
+    """
+    Tabela paginada com ordenação no servidor: só a página visível vai para o st.dataframe.
+    As ordens de cada chave de ordenação são calculadas uma vez por (key, cache_key)
+    e guardadas no session_state, então paginar/reordenar não reprocessa o DataFrame.
+
+    key: prefixo único dos widgets
+    cache_key: identifica o conteúdo de df (ex.: versão da base + período); muda -> recalcula.
+               Sem ele, usa um hash do conteúdo (uma passada por rerun sobre df).
+    default_sort: [(coluna, ascendente), ...] usado na opção "Default"
+    sortable: colunas oferecidas no seletor (padrão: todas)
+    """
+    if df is None or df.empty:
+        st.info("No rows to display.")
+        return
+
+    state_key, page_key = f"_ptable_{key}", f"{key}_page"
+    if cache_key is None:  # forma + colunas não bastam: mesmo shape com outras linhas reusaria a ordem antiga
+        cache_key = (tuple(df.columns), int(pd.util.hash_pandas_object(df, index=True).sum()))
+    cached = st.session_state.get(state_key)
+    if cached is None or cached["cache_key"] != cache_key:
+        cached = {"cache_key": cache_key, "index": _SortIndex(df)}
+        st.session_state[state_key] = cached
+        st.session_state[page_key] = 1  # conteúdo novo: volta para a 1ª página
+    index: _SortIndex = cached["index"]
+
+    default_sort = list(default_sort or [])
+    options = (["Default"] if default_sort else []) + list(sortable or df.columns)
+
+    c1, c2, c3 = st.columns([2, 1, 1])
+    with c1:
+        sort_by = st.selectbox("Sort by", options, index=0, key=f"{key}_sort")
+    with c2:
+        descending = st.toggle("Descending", value=False, key=f"{key}_desc",
+                               disabled=(sort_by == "Default"))
+    n_pages = max(1, math.ceil(len(df) / page_size))
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+    with c3:
+        # página controlada só pelo session_state (sem value=, que conflita com a chave)
+        page = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    keys = default_sort if sort_by == "Default" else [(sort_by, not descending)]
+    order = index.order(keys)
+
+    lo = (int(page) - 1) * page_size
+    hi = min(lo + page_size, len(df))
+    st.dataframe(df.iloc[order[lo:hi]], hide_index=True, use_container_width=True)
+    st.caption(f"Rows {lo + 1:,}–{hi:,} of {len(df):,} · page {int(page)} of {n_pages}")
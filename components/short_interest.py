@@ -1,32 +1,21 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.graph_objects as go
 
-def render_short_interest(cur_df: pd.DataFrame) -> None:
-    if cur_df.empty:
-        st.info("No data in the selected period.")
-        return
+from utils.short_interest import detect_short_interest_peaks
+from utils.peak_attribution import attribute_short_interest_peaks
+from .paginated_table import render_paginated_table
 
-    tmp = cur_df.copy()
-    tmp["date"] = pd.to_datetime(tmp["date"], errors="coerce")
-    tmp["short_interest"] = pd.to_numeric(tmp["short_interest"], errors="coerce")
 
-    sir_by_date = (
-        tmp.groupby("date", as_index=False)["short_interest"]
-           .sum()
-           .sort_values("date")
-    )
-
-    mu = sir_by_date["short_interest"].mean()
-    sd = sir_by_date["short_interest"].std(ddof=0)
-    if pd.notna(sd) and sd > 0:
-        threshold = float(mu + 2*sd); method_label = "μ + 2σ"
-        peaks_by_date = sir_by_date[sir_by_date["short_interest"] > threshold]
-    else:
-        threshold = float(sir_by_date["short_interest"].quantile(0.95)); method_label = "q > 0.95"
-        peaks_by_date = sir_by_date[sir_by_date["short_interest"] > threshold]
+@st.cache_data(show_spinner=False, max_entries=16)
+def _peak_attribution(data_version, start, end, peak_dates: tuple, _df: pd.DataFrame) -> dict:
+    """Atribuição cacheada por (versão da base, janela, picos); _df não entra no hash."""
+    return attribute_short_interest_peaks(_df, peak_dates)
 
-    st.markdown("## Short Interest Evolution with Highlighted Peaks")
+
+def _short_interest_figure(sir_by_date: pd.DataFrame, peaks_by_date: pd.DataFrame,
+                           threshold: float, method_label: str) -> go.Figure:
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=sir_by_date["date"], y=sir_by_date["short_interest"],
                              mode="lines", name="Total Short Interest", line=dict(width=2)))
@@ -41,22 +30,71 @@ def render_short_interest(cur_df: pd.DataFrame) -> None:
         pass
     fig.update_layout(height=320, margin=dict(l=10,r=10,t=30,b=30),
                       xaxis_title="Date", yaxis_title="Total Short Interest")
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+
+def _attribution_figures(attr: dict, top_brokers: int = 10) -> tuple[go.Figure, go.Figure]:
+    """(top brokers por excesso sobre o baseline, contribuição por profile em cada dia de pico)."""
+    top = attr["broker_summary"].head(top_brokers).iloc[::-1]
+    fig_b = go.Figure(go.Bar(
+        x=top["excess"], y=top["broker"], orientation="h",
+        marker=dict(color=np.where(top["excess"] >= 0, "#e74c3c", "#2ecc71")),
+        text=top["share"].map(lambda v: f"{v:.0%}" if pd.notna(v) else ""),
+        textposition="outside",
+    ))
+    fig_b.update_layout(title=f"Top {len(top)} Brokers – Excess Short Interest on Peaks",
+                        height=max(280, 30 * len(top)), margin=dict(l=10, r=20, t=40, b=10),
+                        xaxis_title="Excess over baseline", yaxis_title=None)
 
-    st.markdown("### Brokers Active on Peak Days")
+    prof = attr["profile_days"]
+    fig_p = go.Figure()
+    for profile, g in prof.groupby("profile"):
+        fig_p.add_trace(go.Bar(x=g["date"], y=g["excess"], name=str(profile)))
+    fig_p.update_layout(barmode="relative", title="Profile Contribution by Peak Day",
+                        height=max(280, 30 * len(top)), margin=dict(l=10, r=10, t=40, b=10),
+                        xaxis_title=None, yaxis_title="Excess over baseline",
+                        legend=dict(orientation="h", y=-0.2))
+    return fig_b, fig_p
+
+
+def render_short_interest(cur_df: pd.DataFrame, top_brokers: int = 10) -> None:
+    if cur_df.empty:
+        st.info("No data in the selected period.")
+        return
+
+    tmp = cur_df.copy()
+    tmp["date"] = pd.to_datetime(tmp["date"], errors="coerce")
+    tmp["short_interest"] = pd.to_numeric(tmp["short_interest"], errors="coerce")
+
+    sir_by_date, peaks_by_date, threshold, method_label = detect_short_interest_peaks(tmp)
+
+    st.markdown("## Short Interest Evolution with Highlighted Peaks")
+    st.plotly_chart(_short_interest_figure(sir_by_date, peaks_by_date, threshold, method_label),
+                    use_container_width=True)
+
+    st.markdown("### Peak Attribution")
     if peaks_by_date.empty:
         st.info("No peaks detected for the selected period.")
         return
 
-    df_picos = tmp[tmp["date"].isin(peaks_by_date["date"])].copy()
-    cols = [c for c in ["date","broker","profile","anonymous",
-                        "buy_volume","buy_vwap","sell_volume","sell_vwap"]
-            if c in df_picos.columns]
-    if "date" not in cols:
-        cols = ["date"] + cols
-
-    sort_cols = ["date"] + (["buy_volume"] if "buy_volume" in df_picos.columns else [])
-    sort_asc  = [True] + ([False] if "buy_volume" in df_picos.columns else [])
-    st.dataframe(df_picos[cols].sort_values(sort_cols, ascending=sort_asc)
-                            .reset_index(drop=True),
-                 use_container_width=True)
+    attr = _peak_attribution(cur_df.attrs.get("data_version"), tmp["date"].min(), tmp["date"].max(),
+                             tuple(peaks_by_date["date"]), tmp)
+    st.caption("Contribution = short interest on the peak day minus the entity's average "
+               "on non-peak days of the window (baseline).")
+
+    fig_b, fig_p = _attribution_figures(attr, top_brokers)
+    c1, c2 = st.columns(2)
+    with c1:
+        st.plotly_chart(fig_b, use_container_width=True)
+    with c2:
+        st.plotly_chart(fig_p, use_container_width=True)
+
+    with st.expander("🔎 Broker contributions by peak day"):
+        days = attr["broker_days"][["date", "broker", "short_interest", "baseline", "excess", "share"]]
+        render_paginated_table(
+            days,
+            key="si_peaks",
+            cache_key=(cur_df.attrs.get("data_version"), tmp["date"].min(), tmp["date"].max(), len(days)),
+            page_size=25,
+            default_sort=[("date", True), ("excess", False)],
+        )
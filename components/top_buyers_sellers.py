@@ -5,6 +5,9 @@ import numpy as np
 import streamlit as st
 import plotly.graph_objects as go
 
+from utils.rolling_flow import RollingFlowEngine
+from .paginated_table import render_paginated_table
+
 def _to_num(s: pd.Series) -> pd.Series:
     return pd.to_numeric(s, errors="coerce")
 
@@ -21,7 +24,8 @@ def _normalize(df: pd.DataFrame) -> pd.DataFrame:
             data["broker"] = "Unknown"
     return data
 
-def _bar_h(df: pd.DataFrame, x_col: str, y_col: str, title: str, color: str) -> go.Figure:
+def _bar_h(df: pd.DataFrame, x_col: str, y_col: str, title: str, color: str,
+           x_title: str = "Volume") -> go.Figure:
     fig = go.Figure(go.Bar(
         x=df[x_col],
         y=df[y_col],
@@ -35,44 +39,89 @@ def _bar_h(df: pd.DataFrame, x_col: str, y_col: str, title: str, color: str) ->
         title=title,
         height=h,
         margin=dict(l=10, r=20, t=40, b=10),
-        xaxis_title="Volume",
+        xaxis_title=x_title,
         yaxis_title=None
     )
     return fig
 
-def render_top_buyers_sellers(cur_df: pd.DataFrame, top_n: int = 5, show_tables: bool = False) -> None:
-    """Render two side-by-side bar charts: Top-N Buyers and Top-N Sellers by accumulated volume."""
-    if cur_df is None or cur_df.empty:
-        st.info("No data in the selected period.")
-        return
-
-    data = _normalize(cur_df)
-
+def top_buyers_and_sellers(data: pd.DataFrame, top_n: int = 5) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Top-N brokers por volume acumulado de compra e de venda (data já normalizado)."""
     buyers = (data.groupby("broker", as_index=False)["buy_volume"].sum()
                     .sort_values("buy_volume", ascending=False)
                     .head(top_n))
     sellers = (data.groupby("broker", as_index=False)["sell_volume"].sum()
                      .sort_values("sell_volume", ascending=False)
                      .head(top_n))
+    return buyers, sellers
+
+def _ranking_modes(engine: RollingFlowEngine | None) -> dict[str, str | None]:
+    """Rótulo do modo de ranking -> coluna do snapshot móvel (None = volume acumulado)."""
+    modes: dict[str, str | None] = {"Accumulated volume": None}
+    if engine is not None:
+        modes.update({f"Rolling net flow ({w}d)": f"net_{w}" for w in engine.windows})
+        modes[f"Momentum ({engine.windows[0]}d vs {engine.windows[-1]}d)"] = "momentum"
+    return modes
+
+def top_by_rolling_flow(engine: RollingFlowEngine, as_of, col: str, top_n: int = 5) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Top-N compradores / vendedores pela coluna `col` do snapshot móvel em as_of.
+    Compradores = maiores valores positivos; vendedores = mais negativos (exibidos em módulo).
+    """
+    snap = engine.snapshot(as_of)[["broker", col]].dropna()
+    buyers = snap[snap[col] > 0].sort_values(col, ascending=False).head(top_n)
+    sellers = snap[snap[col] < 0].sort_values(col, ascending=True).head(top_n).assign(**{col: lambda t: -t[col]})
+    return buyers, sellers
+
+def render_top_buyers_sellers(cur_df: pd.DataFrame, top_n: int = 5, show_tables: bool = False,
+                              flow_engine: RollingFlowEngine | None = None) -> None:
+    """
+    Render two side-by-side bar charts: Top-N Buyers and Top-N Sellers by accumulated volume.
+    With a flow_engine, rankings can also use rolling net flow windows or momentum
+    as of the last date of the period.
+    """
+    if cur_df is None or cur_df.empty:
+        st.info("No data in the selected period.")
+        return
+
+    data = _normalize(cur_df)
+
+    modes = _ranking_modes(flow_engine)
+    mode = st.radio("Ranking", list(modes), index=0, horizontal=True, key="tbs_ranking") if len(modes) > 1 \
+        else next(iter(modes))
+    rank_col = modes[mode]
+    by = "Volume" if rank_col is None else mode
+
+    if rank_col is None:
+        buyers, sellers = top_buyers_and_sellers(data, top_n)
+        buy_col, sell_col, x_title, suffix = "buy_volume", "sell_volume", "Volume", "Accumulated Volume"
+    else:
+        as_of = data["date"].max()
+        buyers, sellers = top_by_rolling_flow(flow_engine, as_of, rank_col, top_n)
+        buy_col = sell_col = rank_col
+        x_title = "Momentum" if rank_col == "momentum" else "Net flow"
+        suffix = f"{mode} as of {as_of:%Y-%m-%d}"
 
     col1, col2 = st.columns(2)
     with col1:
-        st.markdown(f"### 🟢 Top {top_n} Buyers (by Volume)")
+        st.markdown(f"### 🟢 Top {top_n} Buyers (by {by})")
         st.plotly_chart(
-            _bar_h(buyers, "buy_volume", "broker", f"Top {top_n} Buyers – Accumulated Volume", "#2ecc71"),
+            _bar_h(buyers, buy_col, "broker", f"Top {top_n} Buyers – {suffix}", "#2ecc71", x_title),
             use_container_width=True
         )
     with col2:
-        st.markdown(f"### 🔴 Top {top_n} Sellers (by Volume)")
+        st.markdown(f"### 🔴 Top {top_n} Sellers (by {by})")
         st.plotly_chart(
-            _bar_h(sellers, "sell_volume", "broker", f"Top {top_n} Sellers – Accumulated Volume", "#e74c3c"),
+            _bar_h(sellers, sell_col, "broker", f"Top {top_n} Sellers – {suffix}", "#e74c3c", x_title),
             use_container_width=True
         )
 
     if show_tables:
         with st.expander("🔎 See data tables"):
             c1, c2 = st.columns(2)
+            cache_key = (cur_df.attrs.get("data_version"), data["date"].min(), data["date"].max(), mode, top_n)
             with c1:
-                st.dataframe(buyers.rename(columns={"buy_volume":"volume"}), use_container_width=True)
+                render_paginated_table(buyers.rename(columns={buy_col: "volume"}), key="tbs_buyers",
+                                       cache_key=cache_key, page_size=10, default_sort=[("volume", False)])
             with c2:
-                st.dataframe(sellers.rename(columns={"sell_volume":"volume"}), use_container_width=True)
+                render_paginated_table(sellers.rename(columns={sell_col: "volume"}), key="tbs_sellers",
+                                       cache_key=cache_key, page_size=10, default_sort=[("volume", False)])
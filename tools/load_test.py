@@ -0,0 +1,203 @@
+"""
+Teste de carga do app.py com sessões concorrentes (Streamlit AppTest).
+
+Cada sessão percorre todas as seções × todos os PERIOD_PRESETS pela sidebar e mede
+a latência de cada rerun. Para cada tamanho de base (gerada sinteticamente) reporta
+p50/p95/p99 da latência e o RSS dos processos.
+
+O AppTest não suporta várias sessões em threads do mesmo processo (o runtime é global),
+então cada sessão roda num processo próprio, todas ao mesmo tempo. Os caches do Streamlit
+ficam por processo; o column store é compartilhado via page cache do SO.
+
+Limitação: isso NÃO é um servidor compartilhado. Em produção as sessões dividem um único
+processo, com st.cache_data/st.cache_resource (base, índices de presets, sketches) montados
+uma vez e disputando o mesmo GIL. Aqui cada sessão paga o próprio cold start e roda em
+paralelo de verdade, então p95/p99 medem o custo por sessão com cache frio + rerun, não a
+fila de um servidor sob carga, e o RSS total soma N cópias dos caches.
+
+    python -m tools.load_test --sessions 8 --sizes 22x262 200x520 1000x1300
+
+Rodar a partir da raiz do repositório (o AppTest carrega app.py e os pacotes locais).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import multiprocessing as mp
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.periods import PERIOD_PRESETS
+
+try:
+    import resource  # só Unix
+except ImportError:  # Windows
+    resource = None
+
+PROFILES = ["Institutional", "HNW", "Retail + Institutional", "Retail"]
+
+
+def generate_data(n_brokers: int, n_days: int, seed: int = 0, end=None) -> pd.DataFrame:
+    """Base sintética no mesmo schema do Broker_Daily_Data.csv (pregões terminando em `end`)."""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or pd.Timestamp.today().normalize() - pd.offsets.BDay(1))
+    dates = pd.bdate_range(end=end, periods=n_days)
+    n = n_brokers * n_days
+
+    buy = rng.integers(500, 50_000, n)
+    sell = rng.integers(500, 50_000, n)
+    start_balance = np.tile(rng.integers(1_000_000, 8_000_000, n_brokers), n_days)
+    return pd.DataFrame({
+        "date": np.repeat(dates, n_brokers).strftime("%Y-%m-%d"),
+        "broker": np.tile([f"Broker {i:04d}" for i in range(n_brokers)], n_days),
+        "buy_volume": buy,
+        "sell_volume": sell,
+        "buy_vwap": rng.normal(0.20, 0.02, n).round(4),
+        "sell_vwap": rng.normal(0.20, 0.02, n).round(4),
+        "start_balance": start_balance,
+        "end_balance": start_balance + buy - sell,
+        "efficiency_score": rng.uniform(0.5, 1.0, n).round(2),
+        "short_interest": rng.integers(500, 20_000, n),
+        "profile": np.tile(rng.choice(PROFILES, n_brokers), n_days),
+    })
+
+
+def rss_mb() -> float:
+    """RSS atual do processo (Linux: /proc; senão o pico via peak_rss_mb)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """
+    Pico de RSS do processo (getrusage: KB no Linux, bytes no macOS).
+    No Windows usa o psutil se estiver instalado (peak working set); senão NaN.
+    """
+    if resource is None:
+        try:
+            import psutil
+        except ImportError:
+            return float("nan")
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024.0 * 1024.0)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def run_session(app_path: str, rounds: int, timeout: float) -> tuple[list[float], list[str], float]:
+    """
+    Uma sessão (num processo worker): carrega o app e cicla seção × preset `rounds` vezes.
+    Retorna (latências ms, erros, pico de RSS do worker em MB).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    latencies, errors = [], []
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    t0 = time.perf_counter()
+    at.run()
+    latencies.append((time.perf_counter() - t0) * 1000.0)
+    if at.exception:
+        return latencies, [str(e.message) for e in at.exception], rss_mb()
+
+    sections = at.sidebar.selectbox[0].options
+    for _ in range(rounds):
+        for section in sections:
+            at.sidebar.selectbox[0].select(section)
+            for preset in PERIOD_PRESETS:
+                at.sidebar.selectbox[1].select(preset)
+                t0 = time.perf_counter()
+                at.run()
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+                if at.exception:
+                    errors.extend(f"{section} / {preset}: {e.message}" for e in at.exception)
+    return latencies, errors, peak_rss_mb()
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    arr = np.asarray(values, dtype=float)
+    return {f"p{q}": float(np.percentile(arr, q)) for q in (50, 95, 99)}
+
+
+def run_size(n_brokers: int, n_days: int, sessions: int, rounds: int, app_path: str, timeout: float) -> dict:
+    with tempfile.TemporaryDirectory(prefix="barometer-load-") as tmp:
+        csv_path = os.path.join(tmp, "Broker_Daily_Data.csv")
+        generate_data(n_brokers, n_days).to_csv(csv_path, index=False)
+        os.environ["BROKER_DATA_PATH"] = csv_path
+
+        # spawn: workers limpos, como processos de servidor recém-iniciados
+        ctx = mp.get_context("spawn")
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=sessions, mp_context=ctx) as pool:
+            futures = [pool.submit(run_session, app_path, rounds, timeout) for _ in range(sessions)]
+            results = [f.result() for f in futures]
+        wall = time.perf_counter() - t0
+
+    latencies = [ms for lat, _, _ in results for ms in lat]
+    errors = [e for _, errs, _ in results for e in errs]
+    worker_rss = [rss for _, _, rss in results]
+    return {
+        "rows": n_brokers * n_days,
+        "brokers": n_brokers,
+        "days": n_days,
+        "sessions": sessions,
+        "reruns": len(latencies),
+        **_percentiles(latencies),
+        "mean": statistics.fmean(latencies),
+        "throughput_rps": len(latencies) / wall if wall else float("nan"),
+        "rss_worker_peak_mb": max(worker_rss),
+        "rss_workers_total_mb": sum(worker_rss),
+        "errors": errors[:20],
+    }
+
+
+def _parse_size(text: str) -> tuple[int, int]:
+    brokers, days = text.lower().split("x")
+    return int(brokers), int(days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py")
+    parser.add_argument("--sessions", type=int, default=8, help="sessões concorrentes")
+    parser.add_argument("--rounds", type=int, default=1, help="voltas seção × preset por sessão")
+    parser.add_argument("--sizes", nargs="+", default=["22x262", "200x520", "1000x1300"],
+                        help="tamanhos da base como BROKERSxDIAS")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--timeout", type=float, default=120.0, help="timeout por rerun (s)")
+    parser.add_argument("--json", dest="json_path", help="grava o resultado em JSON")
+    args = parser.parse_args()
+
+    report = []
+    header = f"{'rows':>10} {'sess':>5} {'reruns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rss/sess MB':>12} {'rss tot MB':>11}"
+    print("note: one process per session; Streamlit caches are not shared between sessions, "
+          "so latencies do not model a single shared server.")
+    print(header)
+    print("-" * len(header))
+    for size in args.sizes:
+        n_brokers, n_days = _parse_size(size)
+        res = run_size(n_brokers, n_days, args.sessions, args.rounds, args.app, args.timeout)
+        report.append(res)
+        print(f"{res['rows']:>10,} {res['sessions']:>5} {res['reruns']:>7} "
+              f"{res['p50']:>9.1f} {res['p95']:>9.1f} {res['p99']:>9.1f} {res['rss_worker_peak_mb']:>12.0f} {res['rss_workers_total_mb']:>11.0f}")
+        for err in res["errors"]:
+            print(f"    ! {err}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import pandas as pd
 
+from .trading_calendar import calendar_codes, code_labels
+
 def get_weekly_top5_brokers(df):
     """
     Retorna os 5 brokers com maior volume líquido (buy - sell) por semana.
@@ -7,23 +9,25 @@ def get_weekly_top5_brokers(df):
     # Garantir que a coluna 'date' está em datetime
     df['date'] = pd.to_datetime(df['date'])
 
-    # Criar coluna de semana
-    df['week'] = df['date'].dt.to_period("W").apply(lambda r: r.start_time.date())
+    # Semana via calendário (week_id inteiro decodificado contra o calendário da base)
+    cal, week_id = calendar_codes(df, 'week_id')
 
     # Calcular volume líquido por broker
     df['net_volume'] = df['buy_volume'] - df['sell_volume']
 
     # Agrupar por semana e broker
-    grouped = df.groupby(['week', 'broker'], as_index=False)['net_volume'].sum()
+    grouped = (pd.DataFrame({'week_id': week_id, 'broker': df['broker'].to_numpy(),
+                             'net_volume': df['net_volume'].to_numpy()})
+                 .groupby(['week_id', 'broker'], as_index=False)['net_volume'].sum())
 
     # Obter top 5 por semana
-    top5_list = []
-    for week, group in grouped.groupby('week'):
-        top5 = group.sort_values('net_volume', ascending=False).head(5)
-        top5['rank'] = range(1, len(top5) + 1)
-        top5_list.append(top5)
+    weekly_top5 = (grouped.sort_values(['week_id', 'net_volume'], ascending=[True, False], kind='stable')
+                          .groupby('week_id').head(5))
+    weekly_top5['rank'] = weekly_top5.groupby('week_id').cumcount() + 1
 
-    weekly_top5 = pd.concat(top5_list).reset_index(drop=True)
+    week_start = code_labels(cal, 'week_id', 'week_start')
+    weekly_top5.insert(0, 'week', pd.to_datetime(week_start[weekly_top5['week_id'].to_numpy()]).date)
+    weekly_top5 = weekly_top5.drop(columns='week_id').reset_index(drop=True)
     return weekly_top5
 
 
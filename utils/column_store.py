@@ -0,0 +1,177 @@
+# utils/column_store.py
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+STORE_FORMAT = 2  # 2: texto ausente gravado como código -1 (antes virava "nan")
+MANIFEST = "manifest.json"
+
+
+def column_store_path(file_path: str) -> str:
+    """Diretório do column store ao lado do CSV (ex.: data/Broker_Daily_Data.colstore)."""
+    root, _ = os.path.splitext(file_path)
+    return root + ".colstore"
+
+
+def _version_dir(store_dir: str, source_version: str | None) -> str:
+    """Um subdiretório imutável por versão da fonte."""
+    return os.path.join(store_dir, source_version or "current")
+
+
+def write_column_store(df: pd.DataFrame, store_dir: str, source_version: str | None = None) -> None:
+    """
+    Grava df como column store: um .npy por coluna, linhas ordenadas por data.
+    - numéricas/booleanas: array nativo
+    - datas: int64 (ns desde epoch)
+    - texto: códigos int32 + dicionário (valores distintos, ordenados) no manifest;
+      valores ausentes ficam com código -1 (e voltam como NaN na leitura)
+    Cada versão da fonte vai para um subdiretório próprio, escrito num diretório temporário
+    e publicado com rename atômico. Se outro processo publicar a mesma versão antes,
+    a cópia local é descartada. Versões antigas ficam para prune_column_store().
+    """
+    data = df.sort_values("date", kind="stable").reset_index(drop=True) if "date" in df.columns else df
+    columns, dictionaries = {}, {}
+
+    os.makedirs(store_dir, exist_ok=True)
+    final_dir = _version_dir(store_dir, source_version)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=store_dir)
+    try:
+        for i, col in enumerate(data.columns):
+            s = data[col]
+            fname = f"{i:03d}.npy"
+            if pd.api.types.is_datetime64_any_dtype(s):
+                arr, kind = s.to_numpy(dtype="datetime64[ns]").view(np.int64), "datetime"
+            elif pd.api.types.is_bool_dtype(s) or pd.api.types.is_numeric_dtype(s):
+                arr, kind = s.to_numpy(), "numeric"
+            else:
+                codes, uniques = pd.factorize(s.map(str, na_action="ignore"), sort=True)
+                arr, kind = codes.astype(np.int32), "dictionary"
+                dictionaries[col] = [str(u) for u in uniques]
+            np.save(os.path.join(tmp_dir, fname), np.ascontiguousarray(arr), allow_pickle=False)
+            columns[col] = {"file": fname, "kind": kind, "dtype": str(arr.dtype)}
+
+        manifest = {
+            "format": STORE_FORMAT,
+            "source_version": source_version,
+            "n_rows": int(len(data)),
+            "sorted_by": "date" if "date" in data.columns else None,
+            "columns": columns,
+            "dictionaries": dictionaries,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        try:
+            os.rename(tmp_dir, final_dir)
+        except OSError:
+            if not os.path.exists(os.path.join(final_dir, MANIFEST)):
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # outro processo publicou antes
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def prune_column_store(store_dir: str, keep: str | None) -> None:
+    """
+    Remove as versões diferentes de keep (leitores já abertos mantêm os mmaps válidos).
+    Quem chama garante que keep é a versão atual da fonte: um processo atrasado que acabou
+    de publicar uma versão velha não pode apagar a nova publicada por outro.
+    """
+    keep_dir = _version_dir(store_dir, keep)
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name)
+        if path != keep_dir and not name.startswith(".tmp-") and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class ColumnStore:
+    """
+    Leitura do column store via memory map (np.load(mmap_mode="r")).
+    Só as colunas (e o intervalo de datas) efetivamente acessadas viram páginas residentes;
+    as páginas vêm do page cache do SO e são compartilhadas entre processos.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self._arrays: dict[str, np.ndarray] = {}
+        self._decoders: dict[str, np.ndarray] = {}
+
+    @property
+    def source_version(self) -> str | None:
+        return self.manifest.get("source_version")
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self.manifest["columns"])
+
+    def __len__(self) -> int:
+        return int(self.manifest["n_rows"])
+
+    def raw(self, col: str) -> np.ndarray:
+        """Array mapeado da coluna (códigos int32 para colunas de dicionário)."""
+        if col not in self._arrays:
+            meta = self.manifest["columns"][col]
+            arr = np.load(os.path.join(self.store_dir, meta["file"]), mmap_mode="r", allow_pickle=False)
+            self._arrays[col] = arr.view("datetime64[ns]") if meta["kind"] == "datetime" else arr
+        return self._arrays[col]
+
+    def dictionary(self, col: str) -> np.ndarray:
+        return np.asarray(self.manifest["dictionaries"][col], dtype=object)
+
+    def _decoder(self, col: str) -> np.ndarray:
+        """Dicionário + NaN no fim: take() com código -1 cai no NaN."""
+        if col not in self._decoders:
+            self._decoders[col] = np.append(self.dictionary(col), np.nan)
+        return self._decoders[col]
+
+    def row_range(self, start=None, end=None) -> slice:
+        """Fatia de linhas com start <= date <= end (busca binária na coluna de datas ordenada)."""
+        if self.manifest.get("sorted_by") != "date" or (start is None and end is None):
+            return slice(0, len(self))
+        dates = self.raw("date")
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start), "ns"), "left"))
+        hi = len(self) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end), "ns"), "right"))
+        return slice(lo, hi)
+
+    def to_frame(self, columns: list[str] | None = None, start=None, end=None,
+                 with_codes: tuple[str, ...] = ("broker", "profile")) -> pd.DataFrame:
+        """
+        DataFrame das colunas pedidas no intervalo [start, end].
+        Colunas numéricas/datas são views do memory map (sem cópia);
+        colunas de texto são decodificadas do dicionário (código -1 -> NaN) e os códigos ficam em <col>_id.
+        O texto continua object, não category: groupby por broker/profile não ganha categorias ausentes.
+        """
+        rows = self.row_range(start, end)
+        data = {}
+        for col in (columns or self.columns):
+            meta = self.manifest["columns"][col]
+            arr = self.raw(col)[rows]
+            if meta["kind"] == "dictionary":
+                data[col] = self._decoder(col).take(arr)
+                if col in with_codes:
+                    data[f"{col}_id"] = arr
+            else:
+                data[col] = arr
+        return pd.DataFrame(data, copy=False)
+
+
+def open_column_store(store_dir: str, source_version: str | None = None) -> ColumnStore | None:
+    """Abre o store da versão da fonte (None se ausente/desatualizado)."""
+    try:
+        store = ColumnStore(_version_dir(store_dir, source_version))
+    except (OSError, ValueError, KeyError):
+        return None
+    if store.manifest.get("format") != STORE_FORMAT:
+        return None
+    if source_version is not None and store.source_version != source_version:
+        return None
+    return store
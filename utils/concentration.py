@@ -0,0 +1,88 @@
+# utils/concentration.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .trading_calendar import calendar_codes
+
+TOP_N_LEVELS = (1, 5, 10)
+
+
+def date_broker_matrix(df: pd.DataFrame, value_col: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Matriz densa data × broker de value_col (uma passada de bincount).
+    Linhas = pregões do calendário da base; colunas = brokers (ordem alfabética).
+    Retorna (matrix, dates, brokers).
+    """
+    cal, day = calendar_codes(df, "trading_day")
+    broker_id, brokers = pd.factorize(df["broker"], sort=True)
+    values = pd.to_numeric(df[value_col], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+
+    n_days, n_brokers = len(cal), len(brokers)
+    valid = broker_id >= 0
+    flat = day[valid].astype(np.int64) * n_brokers + broker_id[valid]
+    matrix = np.bincount(flat, weights=values[valid], minlength=n_days * n_brokers).reshape(n_days, n_brokers)
+    return matrix, cal["date"].to_numpy(), np.asarray(brokers)
+
+
+def rolling_sum(matrix: np.ndarray, window: int) -> np.ndarray:
+    """Soma móvel de `window` linhas via cumsum (janelas parciais no início)."""
+    if window <= 1:
+        return matrix
+    cs = np.vstack([np.zeros((1, matrix.shape[1])), np.cumsum(matrix, axis=0)])
+    idx = np.arange(1, matrix.shape[0] + 1)
+    return cs[idx] - cs[np.maximum(idx - window, 0)]
+
+
+def concentration_from_matrix(matrix: np.ndarray, top_n=TOP_N_LEVELS) -> dict[str, np.ndarray]:
+    """
+    Concentração por linha, vetorizada (sem loop por dia):
+      - hhi:   Herfindahl = Σ share²  (0..1)
+      - topN:  participação dos N maiores brokers (cumsum das shares ordenadas)
+      - eff_n: número efetivo de brokers = 1 / HHI
+    Linhas sem volume ficam NaN.
+    """
+    totals = matrix.sum(axis=1, keepdims=True)
+    shares = np.divide(matrix, totals, out=np.zeros_like(matrix, dtype=np.float64), where=totals > 0)
+    empty = totals[:, 0] <= 0
+
+    hhi = np.square(shares).sum(axis=1)
+    cum = np.cumsum(-np.sort(-shares, axis=1), axis=1)
+
+    out = {"hhi": np.where(empty, np.nan, hhi)}
+    for n in top_n:
+        col = min(n, cum.shape[1]) - 1
+        out[f"top{n}"] = np.where(empty, np.nan, cum[:, col]) if col >= 0 else np.full(len(hhi), np.nan)
+    with np.errstate(divide="ignore"):
+        out["eff_n"] = np.where(empty | (hhi == 0), np.nan, 1.0 / hhi)
+    return out
+
+
+def concentration_series(df: pd.DataFrame, window: int = 1) -> pd.DataFrame:
+    """
+    Série diária (janela móvel de `window` pregões) de HHI, top-1/5/10 e eff_n
+    para compra e venda. Colunas: buy_hhi, buy_top1, ..., sell_eff_n; índice = data.
+    """
+    frames = {}
+    dates = None
+    for side in ("buy", "sell"):
+        matrix, dates, _ = date_broker_matrix(df, f"{side}_volume")
+        stats = concentration_from_matrix(rolling_sum(matrix, window))
+        frames.update({f"{side}_{k}": v for k, v in stats.items()})
+    return pd.DataFrame(frames, index=pd.DatetimeIndex(dates, name="date"))
+
+
+def window_concentration(df: pd.DataFrame) -> dict[str, float]:
+    """Concentração agregada de um período (volumes somados por broker no período)."""
+    out = {}
+    for side in ("buy", "sell"):
+        col = f"{side}_volume"
+        if df is None or df.empty or col not in df.columns:
+            vols = np.zeros((1, 0))
+        else:
+            vols = (pd.to_numeric(df[col], errors="coerce").fillna(0)
+                      .groupby(df["broker"]).sum().to_numpy(dtype=np.float64)[None, :])
+        stats = concentration_from_matrix(vols)
+        out.update({f"{side}_{k}": float(v[0]) for k, v in stats.items()})
+    return out
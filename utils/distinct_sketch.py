@@ -0,0 +1,153 @@
+# utils/distinct_sketch.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .trading_calendar import calendar_codes, is_full_base
+
+# 2^12 registradores de 1 byte por dia (4 KiB/dia)
+HLL_PRECISION = 12
+# janelas com até esse número de linhas são contadas de forma exata
+EXACT_MAX_ROWS = 200_000
+
+_COUNTER_CACHE: dict[tuple, "DistinctCounter"] = {}
+_MAX_CACHED_VERSIONS = 4
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """bit_length exato de uint64 (frexp em metades de 32 bits, sem perda de precisão)."""
+    hi = (x >> np.uint64(32)).astype(np.float64)
+    lo = (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, np.frexp(hi)[1] + 32, np.frexp(lo)[1]).astype(np.int64)
+
+
+def hll_hash(values) -> np.ndarray:
+    """Hash 64 bits estável entre processos (SipHash do pandas)."""
+    return pd.util.hash_array(np.asarray(values, dtype=object).astype(str))
+
+
+def hll_positions(hashes: np.ndarray, p: int = HLL_PRECISION) -> tuple[np.ndarray, np.ndarray]:
+    """(registrador, rho) de cada hash: p bits altos escolhem o registrador; rho = zeros à esquerda + 1 no resto."""
+    q = 64 - p
+    idx = (hashes >> np.uint64(q)).astype(np.int64)
+    rest = hashes & np.uint64((1 << q) - 1)
+    rho = q - _bit_length(rest) + 1
+    return idx, rho.astype(np.uint8)
+
+
+def hll_estimate(registers: np.ndarray, p: int = HLL_PRECISION) -> float:
+    """
+    Estimativa HyperLogLog (Flajolet et al., 2007) com correção de faixa baixa
+    (linear counting enquanto E <= 2.5·m e há registradores zerados).
+    Com hash de 64 bits não há correção de faixa alta.
+    """
+    m = 1 << p
+    alpha = 0.7213 / (1 + 1.079 / m)
+    est = alpha * m * m / float(np.sum(np.ldexp(1.0, -registers.astype(np.int64))))
+    zeros = int(np.count_nonzero(registers == 0))
+    if est <= 2.5 * m and zeros:
+        return m * float(np.log(m / zeros))
+    return est
+
+
+class DistinctCounter:
+    """
+    Contagem de valores distintos (ex.: brokers) em qualquer intervalo de datas.
+
+    Na construção, uma passada sobre as linhas gera um sketch HyperLogLog por pregão
+    (matriz n_dias × 2^p de uint8). Um intervalo é o máximo elemento a elemento dos sketches
+    dos seus dias (merge do HLL), custo O(dias × 2^p) independente do número de linhas.
+
+    Erro do modo aproximado (p = 12, m = 4096 registradores):
+      - erro padrão relativo ≈ 1.04 / √m ≈ 1.6%  (≈ 3.3% com 95% de confiança, ≈ 4.9% com 99.7%)
+      - até ~2.5·m ≈ 10 mil distintos vale o linear counting, com erro padrão
+        √(m·(e^t − t − 1)) / n, t = n/m (≈ 1.1% com 900 distintos, ≈ 1.8% com 10 mil)
+      - estimador sem viés relevante: erros de janelas diferentes não se acumulam numa direção
+      - o erro não cresce com o tamanho do intervalo nem com o número de sketches combinados
+
+    Janelas com até exact_max_rows linhas usam o modo exato (bincount dos códigos),
+    então períodos curtos mostram o número verdadeiro.
+    """
+
+    def __init__(self, df: pd.DataFrame, col: str = "broker", p: int = HLL_PRECISION,
+                 exact_max_rows: int = EXACT_MAX_ROWS):
+        self.col, self.p, self.exact_max_rows = col, p, exact_max_rows
+        self.data_version = df.attrs.get("data_version")
+
+        cal, day = calendar_codes(df, "trading_day")
+        codes, uniques = pd.factorize(df[col])
+        valid = codes >= 0
+        day, codes = day[valid].astype(np.int64), codes[valid]
+        self.dates = cal["date"].to_numpy()
+        self.n_distinct = len(uniques)
+
+        # modo exato: códigos ordenados por dia + offsets de cada dia
+        order = np.argsort(day, kind="stable")
+        self._codes = codes[order]
+        self._offsets = np.r_[0, np.cumsum(np.bincount(day, minlength=len(self.dates)))]
+
+        # modo aproximado: um registrador por (dia, bucket) com o maior rho
+        idx, rho = hll_positions(hll_hash(uniques), p)
+        m = 1 << p
+        self.registers = np.zeros(len(self.dates) * m, dtype=np.uint8)
+        np.maximum.at(self.registers, day * m + idx[codes], rho[codes])
+        self.registers = self.registers.reshape(len(self.dates), m)
+
+    def day_range(self, start=None, end=None) -> slice:
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), "ns"), "left"))
+        hi = len(self.dates) if end is None \
+            else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end), "ns"), "right"))
+        return slice(lo, hi)
+
+    def sketch(self, start=None, end=None) -> np.ndarray:
+        """Sketch HLL do intervalo (merge dos sketches diários)."""
+        days = self.day_range(start, end)
+        if days.stop <= days.start:
+            return np.zeros(1 << self.p, dtype=np.uint8)
+        return self.registers[days].max(axis=0)
+
+    def count(self, start=None, end=None, exact: bool | None = None) -> int:
+        """
+        Distintos em [start, end]. exact=None escolhe pelo número de linhas do intervalo;
+        True/False força o modo.
+        """
+        days = self.day_range(start, end)
+        if days.stop <= days.start:
+            return 0
+        lo, hi = self._offsets[days.start], self._offsets[days.stop]
+        if exact or (exact is None and hi - lo <= self.exact_max_rows):
+            return int(np.count_nonzero(np.bincount(self._codes[lo:hi], minlength=self.n_distinct)))
+        return int(round(hll_estimate(self.sketch(start, end), self.p)))
+
+    def count_frame(self, frame: pd.DataFrame, exact: bool | None = None) -> int:
+        """
+        Distintos em frame. Os sketches só conhecem datas: a contagem por intervalo
+        [min(date), max(date)] só vale se frame for a fatia completa da base nesse intervalo
+        (mesma versão e mesmo número de linhas). Frames filtrados por outras colunas
+        (ex.: profile) caem no nunique() exato de frame.
+        """
+        if frame is None or frame.empty:
+            return 0
+        dates = pd.to_datetime(frame["date"])
+        start, end = dates.min(), dates.max()
+        days = self.day_range(start, end)
+        base_rows = int(self._offsets[days.stop] - self._offsets[days.start])
+        if frame.attrs.get("data_version") != self.data_version or int(frame[self.col].notna().sum()) != base_rows:
+            return int(frame[self.col].nunique())
+        return self.count(start, end, exact=exact)
+
+
+def get_distinct_counter(df: pd.DataFrame, col: str = "broker") -> DistinctCounter:
+    """DistinctCounter da base, construído uma única vez por versão de dados."""
+    version = df.attrs.get("data_version")
+    key = (version, col)
+    if version is not None and key in _COUNTER_CACHE:
+        return _COUNTER_CACHE[key]
+
+    counter = DistinctCounter(df, col=col)
+    if version is not None and is_full_base(df):  # recortes herdam a versão: não entram no cache
+        if len(_COUNTER_CACHE) >= _MAX_CACHED_VERSIONS:
+            _COUNTER_CACHE.clear()
+        _COUNTER_CACHE[key] = counter
+    return counter
@@ -1,10 +1,24 @@
 import pandas as pd
 import os
 
-def load_broker_data(file_path="data/Broker_Daily_Data.csv"):
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
+from .column_store import column_store_path, open_column_store, prune_column_store, write_column_store
+from .trading_calendar import attach_calendar, build_calendar, register_calendar
+
+DEFAULT_DATA_PATH = "data/Broker_Daily_Data.csv"
+
+
+def data_path() -> str:
+    """Caminho da base: variável de ambiente BROKER_DATA_PATH ou o CSV padrão."""
+    return os.environ.get("BROKER_DATA_PATH", DEFAULT_DATA_PATH)
 
+
+def data_version(file_path=DEFAULT_DATA_PATH) -> str:
+    """Identificador barato da versão da base (mtime + tamanho do arquivo)."""
+    info = os.stat(file_path)
+    return f"{info.st_mtime_ns:x}-{info.st_size:x}"
+
+
+def _read_csv(file_path):
     df = pd.read_csv(file_path)
 
     # === Limpeza inicial ===
@@ -18,4 +32,42 @@ def load_broker_data(file_path="data/Broker_Daily_Data.csv"):
     # === Criação da coluna boolean 'anonymous' ===
     df['anonymous'] = df['anon_volume'] > 0  # True se tiver volume anônimo
 
-    return df
\ No newline at end of file
+    # === Calendário: trading_day / week_id / month_id / quarter_id inteiros ===
+    attach_calendar(df, build_calendar(df['date']))
+    return df
+
+
+def load_broker_data(file_path=DEFAULT_DATA_PATH, use_column_store=True):
+    """
+    Carrega a base de brokers.
+    Com use_column_store, lê do column store memory-mapped ao lado do CSV
+    (gerado na primeira carga e regenerado quando o CSV muda).
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
+
+    version = data_version(file_path)
+    store_dir = column_store_path(file_path)
+    store = open_column_store(store_dir, version) if use_column_store else None
+
+    if store is None:
+        df = _read_csv(file_path)
+        if use_column_store:
+            try:
+                write_column_store(df, store_dir, source_version=version)
+                store = open_column_store(store_dir, version)
+                # só quem publicou a versão ainda atual do CSV limpa as demais
+                if data_version(file_path) == version:
+                    prune_column_store(store_dir, keep=version)
+            except OSError:
+                store = None  # diretório sem escrita: segue com o CSV em memória
+
+    if store is not None:
+        df = store.to_frame()
+
+    # versão da base: propagada pelos filtros (df.attrs) e usada como chave de cache
+    df.attrs["data_version"] = version
+    # calendário da base completa: recortes decodificam trading_day/week_id contra ele
+    register_calendar(version, build_calendar(df["date"]), len(df))
+
+    return df
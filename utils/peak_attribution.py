@@ -0,0 +1,64 @@
+# utils/peak_attribution.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+def _attribute(daily: pd.DataFrame, key: str, is_peak: pd.Series) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    daily: short interest por (key, date). Baseline = média de key nos dias SEM pico da janela.
+    Contribuição num dia de pico = short_interest - baseline (excesso sobre o normal).
+    """
+    baseline = daily.loc[~is_peak].groupby(key)["short_interest"].mean()
+    peaks = daily.loc[is_peak].copy()
+    peaks["baseline"] = peaks[key].map(baseline).fillna(0.0).to_numpy()
+    peaks["excess"] = peaks["short_interest"] - peaks["baseline"]
+
+    day_total = peaks.groupby("date")["excess"].transform("sum")
+    peaks["share"] = np.where(day_total != 0, peaks["excess"] / day_total, np.nan)
+
+    summary = (peaks.groupby(key)
+                    .agg(peak_days=("date", "nunique"),
+                         short_interest=("short_interest", "sum"),
+                         baseline=("baseline", "first"),
+                         excess=("excess", "sum"),
+                         avg_excess=("excess", "mean"))
+                    .sort_values("excess", ascending=False))
+    total = summary["excess"].sum()
+    summary["share"] = summary["excess"] / total if total else np.nan
+    summary["rank"] = np.arange(1, len(summary) + 1)
+    return peaks.sort_values(["date", "excess"], ascending=[True, False]).reset_index(drop=True), \
+        summary.reset_index()
+
+
+def attribute_short_interest_peaks(df: pd.DataFrame, peak_dates) -> dict[str, pd.DataFrame]:
+    """
+    Atribuição dos picos de short interest por broker e por profile.
+    Uma única agregação (broker, profile, date) da janela; baselines pré-calculados
+    sobre os dias sem pico e excessos vetorizados nos dias de pico.
+    Retorna {"broker_days", "broker_summary", "profile_days", "profile_summary"}.
+    """
+    empty = pd.DataFrame()
+    if df is None or df.empty or len(peak_dates) == 0:
+        return {"broker_days": empty, "broker_summary": empty, "profile_days": empty, "profile_summary": empty}
+
+    data = df[["date", "broker", "short_interest"]].copy()
+    data["profile"] = df["profile"] if "profile" in df.columns else "Unknown"
+    data["date"] = pd.to_datetime(data["date"])
+    data["short_interest"] = pd.to_numeric(data["short_interest"], errors="coerce").fillna(0)
+
+    daily = data.groupby(["broker", "profile", "date"], as_index=False, sort=False)["short_interest"].sum()
+    peak_set = pd.to_datetime(pd.Series(list(peak_dates)))
+
+    by_broker = daily.groupby(["broker", "date"], as_index=False, sort=False)["short_interest"].sum()
+    by_profile = daily.groupby(["profile", "date"], as_index=False, sort=False)["short_interest"].sum()
+
+    broker_days, broker_summary = _attribute(by_broker, "broker", by_broker["date"].isin(peak_set))
+    profile_days, profile_summary = _attribute(by_profile, "profile", by_profile["date"].isin(peak_set))
+    return {
+        "broker_days": broker_days,
+        "broker_summary": broker_summary,
+        "profile_days": profile_days,
+        "profile_summary": profile_summary,
+    }
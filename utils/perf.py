@@ -0,0 +1,46 @@
+# utils/perf.py
+from __future__ import annotations
+
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+_KEY = "_render_timings"
+
+
+@contextmanager
+def timed(stage: str, history: int = 50):
+    """Mede o tempo de um trecho do rerun e guarda no session_state (últimas `history` medições)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000.0
+        timings = st.session_state.setdefault(_KEY, {})
+        timings.setdefault(stage, deque(maxlen=history)).append(ms)
+
+
+def last_timing(stage: str) -> float | None:
+    runs = st.session_state.get(_KEY, {}).get(stage)
+    return runs[-1] if runs else None
+
+
+def timings_table() -> pd.DataFrame:
+    """Resumo por etapa: última medição, mediana e nº de execuções (ms)."""
+    rows = [
+        {"stage": stage, "last_ms": runs[-1], "median_ms": float(pd.Series(runs).median()), "runs": len(runs)}
+        for stage, runs in st.session_state.get(_KEY, {}).items() if runs
+    ]
+    return pd.DataFrame(rows, columns=["stage", "last_ms", "median_ms", "runs"])
+
+
+def render_timings_sidebar() -> None:
+    """Expander na sidebar com os tempos de render por etapa."""
+    table = timings_table()
+    if table.empty:
+        return
+    with st.sidebar.expander("⏱ Render timings", expanded=False):
+        st.dataframe(table.round(1), hide_index=True, use_container_width=True)
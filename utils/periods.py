@@ -1,6 +1,7 @@
 # components/periods.py
 from datetime import datetime, timedelta
 from typing import Tuple
+import numpy as np
 import pandas as pd
 
 PERIOD_PRESETS = [
@@ -10,31 +11,50 @@ PERIOD_PRESETS = [
     "Last 12 months",
 ]
 
-def _last_closed_week() -> Tuple[pd.Timestamp, pd.Timestamp]:
-    """Seg–Sex da última semana fechada, como timestamps."""
-    today = datetime.today()
+def _last_closed_week(today=None) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """Seg–Sex da última semana fechada antes de `today` (padrão: hoje), como timestamps."""
+    today = pd.Timestamp(today).to_pydatetime() if today is not None else datetime.today()
     days_since_monday = today.weekday()
     monday = today - timedelta(days=days_since_monday + 7)  # volta 1 semana completa
     friday = monday + timedelta(days=4)
     return pd.to_datetime(monday.date()), pd.to_datetime(friday.date())
 
-def _last_n_weeks_range(n: int) -> Tuple[pd.Timestamp, pd.Timestamp]:
+def _last_n_weeks_range(n: int, today=None) -> Tuple[pd.Timestamp, pd.Timestamp]:
     """N semanas completas terminando na última semana fechada (0 + n-1 anteriores)."""
     # semana 0
-    start0, end0 = _last_closed_week()
+    start0, end0 = _last_closed_week(today)
     # volta (n-1) semanas
     startN = start0 - pd.Timedelta(weeks=n-1)
     return startN.normalize(), end0.normalize()
 
-def get_period_by_preset(preset: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
-    """Período atual para cada preset (sempre terminando na sex. da última semana fechada)."""
-    _, anchor_end = _last_closed_week()
+def data_anchor(dates) -> pd.Timestamp | None:
+    """
+    Referência ("hoje") que faz a última semana fechada ser a última semana fechada da base:
+    a semana do último pregão conta como fechada quando a base chega à sexta-feira;
+    senão vale a semana anterior. Retorna a segunda-feira seguinte à semana escolhida.
+    """
+    dates = pd.to_datetime(pd.Series(dates)).dropna()
+    if dates.empty:
+        return None
+    last = dates.max().normalize()
+    monday = last - pd.Timedelta(days=last.weekday())
+    if last.weekday() < 4:  # semana do último pregão ainda aberta
+        monday -= pd.Timedelta(weeks=1)
+    return monday + pd.Timedelta(weeks=1)
+
+
+def get_period_by_preset(preset: str, today=None) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Período atual para cada preset (sempre terminando na sex. da última semana fechada).
+    today: referência (ex.: data_anchor(df["date"])); padrão = data de hoje.
+    """
+    _, anchor_end = _last_closed_week(today)
 
     if preset == "Last closed week":
-        return _last_closed_week()
+        return _last_closed_week(today)
 
     if preset == "Last 4 weeks":
-        return _last_n_weeks_range(4)
+        return _last_n_weeks_range(4, today)
 
     if preset == "Last 3 months":
         start = (anchor_end + pd.Timedelta(days=1)) - pd.DateOffset(months=3)
@@ -54,8 +74,8 @@ def previous_period_by_preset(preset: str,
     start_date = pd.to_datetime(start_date); end_date = pd.to_datetime(end_date)
 
     if preset == "Last closed week":
-        prev_end = start_date - pd.Timedelta(days=1)      # sexta anterior
-        prev_start = prev_end - pd.Timedelta(days=4)      # segunda anterior
+        prev_start = start_date - pd.Timedelta(weeks=1)   # segunda anterior
+        prev_end = prev_start + pd.Timedelta(days=4)      # sexta anterior
         return prev_start.normalize(), prev_end.normalize()
 
     if preset == "Last 4 weeks":
@@ -77,3 +97,44 @@ def previous_period_by_preset(preset: str,
     prev_end = start_date - pd.Timedelta(days=1)
     prev_start = prev_end - (end_date - start_date)
     return prev_start.normalize(), prev_end.normalize()
+
+
+def resolve_presets(today=None) -> dict[str, dict[str, pd.Timestamp]]:
+    """Janelas atual e anterior de todos os PERIOD_PRESETS para a mesma referência."""
+    periods = {}
+    for preset in PERIOD_PRESETS:
+        start, end = get_period_by_preset(preset, today)
+        prev_start, prev_end = previous_period_by_preset(preset, start, end)
+        periods[preset] = {"start": start, "end": end, "prev_start": prev_start, "prev_end": prev_end}
+    return periods
+
+
+# códigos de bucket por linha e preset
+OUTSIDE, PREVIOUS, CURRENT = 0, 1, 2
+
+
+def assign_period_buckets(dates, periods: dict[str, dict[str, pd.Timestamp]]) -> np.ndarray:
+    """
+    Bucket (OUTSIDE / PREVIOUS / CURRENT) de cada data para todos os presets de uma vez.
+    Todas as bordas dos presets viram um único vetor ordenado; um searchsorted das datas
+    nesse vetor dá o segmento de cada linha e uma tabela segmento × preset dá o bucket.
+    Retorna int8 [n_datas, n_presets] na ordem de `periods`.
+    """
+    values = pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[ns]")
+    one_day = np.timedelta64(1, "D")
+    edges = np.unique(np.array(
+        [np.datetime64(p[k], "ns") for p in periods.values() for k in ("prev_start", "start")]
+        + [np.datetime64(p[k], "ns") + one_day for p in periods.values() for k in ("prev_end", "end")],
+        dtype="datetime64[ns]",
+    ))
+    segment = np.searchsorted(edges, values, side="right")  # segmento s = [edges[s-1], edges[s])
+
+    # bucket de cada segmento (pelo seu início) em cada preset
+    seg_start = np.r_[np.datetime64("NaT", "ns"), edges]
+    table = np.zeros((len(edges) + 1, len(periods)), dtype=np.int8)
+    for j, p in enumerate(periods.values()):
+        prev = (seg_start >= np.datetime64(p["prev_start"], "ns")) & (seg_start <= np.datetime64(p["prev_end"], "ns"))
+        cur = (seg_start >= np.datetime64(p["start"], "ns")) & (seg_start <= np.datetime64(p["end"], "ns"))
+        table[prev, j] = PREVIOUS
+        table[cur, j] = CURRENT
+    return table[segment]
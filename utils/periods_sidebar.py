@@ -1,9 +1,74 @@
 # components/periods_sidebar.py
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 import streamlit as st
-from .periods import PERIOD_PRESETS, get_period_by_preset, previous_period_by_preset
+from .periods import (PERIOD_PRESETS, CURRENT, PREVIOUS, assign_period_buckets, data_anchor,
+                      resolve_presets)
+
+
+def _num(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+
+
+def build_preset_index(df: pd.DataFrame, date_col: str = "date") -> dict:
+    """
+    Todos os presets de uma vez, ancorados na última semana fechada da base:
+      - periods: janelas atual/anterior de cada preset
+      - rows: {(preset, CURRENT|PREVIOUS): posições das linhas}
+      - summary: linhas e totais (buy/sell/net) atual e anterior por preset
+    Um único searchsorted atribui o bucket de cada linha em todos os presets.
+    """
+    periods = resolve_presets(data_anchor(df[date_col]))
+    buckets = assign_period_buckets(df[date_col], periods)
+    buy, sell = _num(df, "buy_volume"), _num(df, "sell_volume")
+
+    rows, summary = {}, []
+    for j, preset in enumerate(periods):
+        code = buckets[:, j]
+        counts = np.bincount(code, minlength=3)
+        buy_tot = np.bincount(code, weights=buy, minlength=3)
+        sell_tot = np.bincount(code, weights=sell, minlength=3)
+        for bucket in (CURRENT, PREVIOUS):
+            rows[(preset, bucket)] = np.flatnonzero(code == bucket)
+        summary.append({
+            "preset": preset,
+            "rows": int(counts[CURRENT]),
+            "prev_rows": int(counts[PREVIOUS]),
+            "buy_volume": buy_tot[CURRENT],
+            "sell_volume": sell_tot[CURRENT],
+            "net_flow": buy_tot[CURRENT] - sell_tot[CURRENT],
+            "prev_volume": buy_tot[PREVIOUS] + sell_tot[PREVIOUS],
+        })
+    summary = pd.DataFrame(summary).set_index("preset")
+    total = summary["buy_volume"] + summary["sell_volume"]
+    summary["volume_change"] = (total / summary["prev_volume"].where(summary["prev_volume"] > 0) - 1) * 100
+    return {"periods": periods, "rows": rows, "summary": summary}
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _preset_index(data_version: str | None, date_col: str, _df: pd.DataFrame) -> dict:
+    """Índice de presets por versão da base (compartilhado entre sessões; não mutar)."""
+    return build_preset_index(_df, date_col)
+
+
+def _render_preset_summary(summary: pd.DataFrame) -> None:
+    table = pd.DataFrame({
+        "Rows": summary["rows"],
+        "Net flow": summary["net_flow"],
+        "Vol. Δ%": summary["volume_change"],
+    })
+    st.sidebar.dataframe(
+        table, use_container_width=True,
+        column_config={
+            "Rows": st.column_config.NumberColumn(format="%d"),
+            "Net flow": st.column_config.NumberColumn(format="%+,.0f"),
+            "Vol. Δ%": st.column_config.NumberColumn(format="%+.1f%%"),
+        },
+    )
 
 
 def render_period_sidebar(
@@ -19,21 +84,26 @@ def render_period_sidebar(
     if show_filters_title:
         st.sidebar.title("")
 
-    # Controls
-    section = st.sidebar.selectbox("Section", sections, index=0)
-    preset = st.sidebar.selectbox("Reference period", PERIOD_PRESETS, index=0)
+    # Datas já convertidas evitam cópia; senão converte uma vez
+    if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+        df = df.assign(**{date_col: pd.to_datetime(df[date_col])})
 
-    # Current period
-    start_date, end_date = get_period_by_preset(preset)
+    # Todos os presets de uma vez (cache por versão da base): trocar de preset só fatia linhas
+    version = df.attrs.get("data_version")
+    index = _preset_index(version, date_col, df) if version is not None else build_preset_index(df, date_col)
+    summary = index["summary"]
 
-    # Data filtering
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
-    cur_df = df[(df[date_col] >= start_date) & (df[date_col] <= end_date)].copy()
+    # Controls
+    section = st.sidebar.selectbox("Section", sections, index=0)
+    preset = st.sidebar.selectbox("Reference period", PERIOD_PRESETS, index=0,
+                                  format_func=lambda p: f"{p} · {summary.at[p, 'rows']:,} rows")
+    _render_preset_summary(summary)
 
-    # Previous equivalent period
-    prev_start, prev_end = previous_period_by_preset(preset, start_date, end_date)
-    prev_df = df[(df[date_col] >= prev_start) & (df[date_col] <= prev_end)].copy()
+    # Current / previous equivalent period
+    period = index["periods"][preset]
+    start_date, end_date = period["start"], period["end"]
+    cur_df = df.take(index["rows"][(preset, CURRENT)])
+    prev_df = df.take(index["rows"][(preset, PREVIOUS)])
 
     period_label = f"{start_date:%Y/%m/%d} – {end_date:%Y/%m/%d}"
     return section, preset, start_date, end_date, cur_df, prev_df, period_label
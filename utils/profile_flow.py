@@ -0,0 +1,103 @@
+# utils/profile_flow.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .trading_calendar import calendar_codes
+
+MEASURES = ("buy", "sell", "gross")
+
+
+class ProfileFlow:
+    """
+    Fluxo por profile × pregão do histórico inteiro (matrizes densas buy/sell),
+    montado numa única passada de bincount sobre as linhas brutas.
+
+    Qualquer janela [start, end] é uma fatia de linhas da matriz (busca binária nas datas);
+    a série semanal é uma redução por week_id das linhas já agregadas.
+    Nada disso volta a agrupar o DataFrame original.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        cal, day = calendar_codes(df, "trading_day")
+        profiles = df["profile"] if "profile" in df.columns else pd.Series("Unknown", index=df.index)
+        profile_id, names = pd.factorize(profiles.astype(str), sort=True)
+
+        n_days, n_prof = len(cal), len(names)
+        flat = day.astype(np.int64) * n_prof + profile_id
+        self.dates = cal["date"].to_numpy()
+        self.week_id = cal["week_id"].to_numpy()
+        self.week_start = cal["week_start"].to_numpy()
+        self.profiles = np.asarray(names)
+        self.data_version = df.attrs.get("data_version")
+        self.matrix = {}
+        for side in ("buy", "sell"):
+            col = f"{side}_volume"
+            values = pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=np.float64) \
+                if col in df.columns else np.zeros(len(df))
+            self.matrix[side] = np.bincount(flat, weights=values, minlength=n_days * n_prof) \
+                .reshape(n_days, n_prof)
+
+    def rows(self, start=None, end=None) -> slice:
+        """Linhas (pregões) com start <= date <= end."""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), "ns"), "left"))
+        hi = len(self.dates) if end is None \
+            else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end), "ns"), "right"))
+        return slice(lo, hi)
+
+    def weekly(self, start=None, end=None) -> pd.DataFrame:
+        """Formato longo week_start × profile com buy, sell e net (semanas com pregão no intervalo)."""
+        rows = self.rows(start, end)
+        weeks = self.week_id[rows]
+        if len(weeks) == 0:
+            return pd.DataFrame(columns=["week_start", "profile", "buy", "sell", "net"])
+        # datas ordenadas -> week_id não decrescente; cada semana é um bloco contíguo
+        starts = np.flatnonzero(np.r_[True, weeks[1:] != weeks[:-1]])
+        buy = np.add.reduceat(self.matrix["buy"][rows], starts, axis=0)
+        sell = np.add.reduceat(self.matrix["sell"][rows], starts, axis=0)
+        n_weeks, n_prof = buy.shape
+        return pd.DataFrame({
+            "week_start": np.repeat(self.week_start[rows][starts], n_prof),
+            "profile": np.tile(self.profiles, n_weeks),
+            "buy": buy.ravel(),
+            "sell": sell.ravel(),
+            "net": (buy - sell).ravel(),
+        })
+
+    def totals(self, start=None, end=None) -> pd.DataFrame:
+        """Totais por profile na janela: buy, sell, gross (buy + sell) e net."""
+        rows = self.rows(start, end)
+        buy = self.matrix["buy"][rows].sum(axis=0)
+        sell = self.matrix["sell"][rows].sum(axis=0)
+        return pd.DataFrame({"buy": buy, "sell": sell, "gross": buy + sell, "net": buy - sell},
+                            index=pd.Index(self.profiles, name="profile"))
+
+
+def decompose_change(prev: pd.DataFrame, cur: pd.DataFrame, measure: str = "gross") -> pd.DataFrame:
+    """
+    Decomposição da variação de `measure` por profile entre duas janelas:
+      v_p = V · s_p  (V = total da janela, s_p = participação do profile)
+      Δv_p = ΔV · s_p(prev)        -> efeito volume (mercado inteiro cresceu/encolheu)
+           + V(cur) · Δs_p         -> efeito mix   (profile ganhou/perdeu participação)
+    Os dois efeitos somam exatamente a variação observada.
+    """
+    if measure not in MEASURES:
+        raise ValueError(f"measure must be one of {MEASURES}")
+    prev_v = prev[measure].reindex(cur.index.union(prev.index), fill_value=0.0)
+    cur_v = cur[measure].reindex(prev_v.index, fill_value=0.0)
+
+    prev_total, cur_total = float(prev_v.sum()), float(cur_v.sum())
+    prev_share = prev_v / prev_total if prev_total else prev_v * 0.0
+    cur_share = cur_v / cur_total if cur_total else cur_v * 0.0
+
+    out = pd.DataFrame({
+        "previous": prev_v,
+        "current": cur_v,
+        "change": cur_v - prev_v,
+        "volume_effect": (cur_total - prev_total) * prev_share,
+        "mix_effect": cur_total * (cur_share - prev_share),
+        "prev_share": prev_share,
+        "cur_share": cur_share,
+    })
+    return out.sort_values("current", ascending=False).reset_index()
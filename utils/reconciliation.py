@@ -0,0 +1,96 @@
+# utils/reconciliation.py
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from .trading_calendar import calendar_codes
+
+CHECKS = {
+    "continuity_break": "start_balance differs from the broker's previous end_balance",
+    "missing_days": "broker skipped one or more trading days",
+    "duplicate_day": "more than one row for the same broker and date",
+    "flow_mismatch": "end_balance - start_balance differs from buy_volume - sell_volume",
+}
+
+
+def _num(df: pd.DataFrame, col: str) -> np.ndarray:
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+
+
+def reconcile_balances(df: pd.DataFrame, tolerance: float = 0.0) -> pd.DataFrame:
+    """
+    Reconciliação vetorizada do histórico de saldos.
+    Ordena por (broker, pregão) uma única vez e compara arrays deslocados em 1 posição
+    (sem loop por broker). Retorna uma linha por inconsistência:
+    broker, date, check, expected, actual, diff.
+    """
+    cols = ["broker", "date", "check", "expected", "actual", "diff"]
+    if df is None or df.empty:
+        return pd.DataFrame(columns=cols)
+
+    _, day = calendar_codes(df, "trading_day")
+    broker_id, brokers = pd.factorize(df["broker"], sort=True)
+
+    order = np.lexsort((day, broker_id))
+    b, d = broker_id[order], day[order]
+    start, end = _num(df, "start_balance")[order], _num(df, "end_balance")[order]
+    flow = _num(df, "buy_volume")[order] - _num(df, "sell_volume")[order]
+    dates = pd.to_datetime(df["date"]).to_numpy()[order]
+
+    same = np.zeros(len(b), dtype=bool)
+    same[1:] = b[1:] == b[:-1]
+    prev_end = np.r_[np.nan, end[:-1]]
+    day_step = np.r_[0, np.diff(d)]
+
+    found = []
+
+    def _pick(mask, expected, actual):
+        idx = np.flatnonzero(mask)
+        return idx, expected[idx], actual[idx]
+
+    checks = {
+        "continuity_break": _pick(same & (np.abs(start - prev_end) > tolerance), prev_end, start),
+        "missing_days": _pick(same & (day_step > 1), np.ones(len(b)), day_step.astype(np.float64)),
+        "duplicate_day": _pick(same & (day_step == 0), np.ones(len(b)), np.zeros(len(b))),
+        "flow_mismatch": _pick(np.abs((end - start) - flow) > tolerance, flow, end - start),
+    }
+    for name, (idx, expected, actual) in checks.items():
+        found.append(pd.DataFrame({
+            "broker": np.asarray(brokers)[b[idx]],
+            "date": dates[idx],
+            "check": name,
+            "expected": expected,
+            "actual": actual,
+            "diff": actual - expected,
+        }))
+
+    return pd.concat(found, ignore_index=True)[cols].sort_values(["broker", "date", "check"], kind="stable") \
+             .reset_index(drop=True)
+
+
+def reconciliation_report(df: pd.DataFrame, issues: pd.DataFrame | None = None,
+                          tolerance: float = 0.0, max_issues: int | None = None) -> dict:
+    """Relatório legível por máquina (dict pronto para JSON) da reconciliação."""
+    issues = reconcile_balances(df, tolerance) if issues is None else issues
+    counts = issues["check"].value_counts()
+    per_broker = issues.groupby(["broker", "check"]).size().unstack(fill_value=0)
+
+    listed = issues if max_issues is None else issues.head(max_issues)
+    listed = listed.assign(date=pd.to_datetime(listed["date"]).dt.strftime("%Y-%m-%d"))
+
+    return {
+        "data_version": df.attrs.get("data_version") if df is not None else None,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "tolerance": tolerance,
+        "rows_checked": 0 if df is None else int(len(df)),
+        "brokers_checked": 0 if df is None or df.empty else int(df["broker"].nunique()),
+        "checks": {name: {"description": desc, "issues": int(counts.get(name, 0))}
+                   for name, desc in CHECKS.items()},
+        "per_broker": {str(broker): {k: int(v) for k, v in row.items()}
+                       for broker, row in per_broker.iterrows()},
+        "issues": listed.to_dict("records"),
+        "issues_truncated": max_issues is not None and len(issues) > max_issues,
+    }
@@ -0,0 +1,239 @@
+# utils/rolling_flow.py
+from __future__ import annotations
+
+import copy
+import threading
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_WINDOWS = (5, 20, 60)
+
+# engine por (versão da base, janelas); publicado imutável (sessões só leem)
+_ENGINE_CACHE: dict[tuple, "RollingFlowEngine"] = {}
+_ENGINE_LOCK = threading.Lock()
+_MAX_CACHED_VERSIONS = 4
+
+
+def _num(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+
+
+class RollingFlowEngine:
+    """
+    Estatísticas móveis por broker (net flow, buy/sell ratio, VWAP ponderado por volume)
+    para várias janelas de pregões ao mesmo tempo.
+
+    Os dados ficam ordenados por (broker, pregão) com somas acumuladas por broker.
+    A janela w no pregão t cobre os pregões (t - w, t] do calendário (ordinal trading_day),
+    não as últimas w linhas do broker: é cum[até t] - cum[até t - w], com as duas posições
+    achadas por searchsorted na chave (broker, pregão). Pregões sem linha do broker contam zero.
+    Todas as janelas saem dos mesmos acumulados, sem refiltrar/reagrupar.
+
+    append() processa só as linhas novas: os acumulados continuam a partir do último valor
+    de cada broker (a base é append-only). Engines compartilhados entre sessões vêm de
+    get_rolling_flow_engine() e não são mais alterados depois de publicados.
+    """
+
+    _CUM = ("buy", "sell", "buy_notional", "sell_notional")
+
+    def __init__(self, windows=DEFAULT_WINDOWS):
+        self.windows = tuple(sorted(set(int(w) for w in windows)))
+        self.data_version: str | None = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.brokers: list[str] = []
+        self._codes: dict[str, int] = {}
+        self.broker_id = np.empty(0, dtype=np.int64)
+        self.dates = np.empty(0, dtype="datetime64[ns]")
+        self.days = np.empty(0, dtype="datetime64[ns]")  # calendário de pregões vistos (ordinal = posição)
+        self.day = np.empty(0, dtype=np.int64)
+        self._key = np.empty(0, dtype=np.int64)
+        self.cum = {k: np.empty(0) for k in self._CUM}
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.broker_id)
+
+    @property
+    def last_date(self):
+        return self.days[-1] if len(self.days) else None
+
+    def copy(self) -> "RollingFlowEngine":
+        """Cópia independente: append() troca os arrays, então só lista/dicionário são copiados."""
+        new = copy.copy(self)
+        new.brokers, new._codes, new.cum = list(self.brokers), dict(self._codes), dict(self.cum)
+        return new
+
+    # --- construção ---
+    def fit(self, df: pd.DataFrame) -> "RollingFlowEngine":
+        self._reset()
+        self.append(df)
+        self.data_version = df.attrs.get("data_version")
+        return self
+
+    def append(self, new_df: pd.DataFrame) -> "RollingFlowEngine":
+        """
+        Acrescenta pregões novos (datas posteriores às já carregadas para cada broker).
+        Datas novas no calendário precisam ser posteriores ao último pregão carregado,
+        para que os ordinais não mudem. Valida tudo antes de alterar o engine:
+        um append rejeitado (ValueError) não deixa estado parcial.
+        """
+        if new_df is None or new_df.empty:
+            return self
+
+        # dicionário de brokers: códigos provisórios para nomes novos (só gravados no fim)
+        names = new_df["broker"].astype(str).to_numpy()
+        added = [n for n in pd.unique(names) if n not in self._codes]
+        codes_map = {**self._codes, **{n: len(self.brokers) + i for i, n in enumerate(added)}}
+        codes = pd.Series(names).map(codes_map).to_numpy(dtype=np.int64)
+        dates = pd.to_datetime(new_df["date"]).to_numpy(dtype="datetime64[ns]")
+
+        order = np.lexsort((dates, codes))
+        codes, dates = codes[order], dates[order]
+
+        # última linha (e data) de cada broker já carregado; -1 para brokers novos
+        last_idx = np.full(len(codes_map), -1, dtype=np.int64)
+        if self.n_rows:
+            ends = np.flatnonzero(np.r_[self.broker_id[1:] != self.broker_id[:-1], True])
+            last_idx[self.broker_id[ends]] = ends
+            known = last_idx[codes] >= 0
+            if (dates[known] <= self.dates[last_idx[codes][known]]).any():
+                raise ValueError("append() only accepts dates after each broker's last loaded date.")
+        new_days = np.setdiff1d(dates, self.days)
+        if len(self.days) and len(new_days) and new_days[0] < self.days[-1]:
+            raise ValueError("append() only accepts new trading days after the last loaded one.")
+
+        buy, sell = _num(new_df, "buy_volume")[order], _num(new_df, "sell_volume")[order]
+        values = {
+            "buy": buy,
+            "sell": sell,
+            "buy_notional": buy * _num(new_df, "buy_vwap")[order],
+            "sell_notional": sell * _num(new_df, "sell_vwap")[order],
+        }
+        starts = np.r_[True, codes[1:] != codes[:-1]]
+        group_first = np.maximum.accumulate(np.where(starts, np.arange(len(codes)), 0))
+        new_cum = {}
+        for k, v in values.items():
+            cs = np.cumsum(v)
+            within = cs - (cs[group_first] - v[group_first])  # cumsum reiniciando por broker
+            base = np.where(last_idx[codes] >= 0, self.cum[k][np.maximum(last_idx[codes], 0)], 0.0) \
+                if self.n_rows else 0.0
+            new_cum[k] = base + within
+
+        # junta e reordena por (broker, data)
+        all_b = np.r_[self.broker_id, codes]
+        all_d = np.r_[self.dates, dates]
+        perm = np.lexsort((all_d, all_b))
+
+        self.brokers.extend(added)
+        self._codes = codes_map
+        self.days = np.r_[self.days, new_days]
+        self.broker_id, self.dates = all_b[perm], all_d[perm]
+        self.day = np.searchsorted(self.days, self.dates).astype(np.int64)
+        self._key = (self.broker_id << 32) + self.day
+        self.cum = {k: np.r_[self.cum[k], new_cum[k]][perm] for k in self._CUM}
+        return self
+
+    def extended(self, df: pd.DataFrame) -> "RollingFlowEngine | None":
+        """
+        Novo engine para df a partir deste (sem alterá-lo): cópia + append das linhas
+        posteriores ao último pregão. None se df não for uma extensão append-only desta base.
+        """
+        dates = pd.to_datetime(df["date"])
+        last = self.last_date
+        if not self.n_rows or last is None or int((dates <= last).sum()) != self.n_rows \
+                or not (dates > last).any():
+            return None
+        new = self.copy().append(df[dates > last])
+        new.data_version = df.attrs.get("data_version")
+        return new
+
+    # --- cálculo ---
+    def _last_row(self, broker_id: np.ndarray, day: np.ndarray) -> np.ndarray:
+        """Índice da última linha de cada broker com pregão <= day (-1 se não houver)."""
+        j = np.searchsorted(self._key, (broker_id << 32) + day, side="right") - 1
+        ok = (j >= 0) & (self.broker_id[np.maximum(j, 0)] == broker_id)
+        return np.where(ok, j, -1)
+
+    def _window_stats(self, broker_id: np.ndarray, day: np.ndarray) -> dict[str, np.ndarray]:
+        """net/ratio/vwap de todas as janelas terminando no pregão day (inclusive) de cada broker."""
+        end = self._last_row(broker_id, day)
+        stats = {}
+        for w in self.windows:
+            start = self._last_row(broker_id, day - w)
+            win = {}
+            for k in self._CUM:
+                c = self.cum[k]
+                win[k] = np.where(end >= 0, c[np.maximum(end, 0)], 0.0) \
+                    - np.where(start >= 0, c[np.maximum(start, 0)], 0.0)
+
+            vol = win["buy"] + win["sell"]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(win["sell"] > 0, win["buy"] / win["sell"], np.nan)
+                vwap = np.where(vol > 0, (win["buy_notional"] + win["sell_notional"]) / vol, np.nan)
+            stats.update({f"net_{w}": win["buy"] - win["sell"], f"ratio_{w}": ratio, f"vwap_{w}": vwap})
+        return stats
+
+    # --- consulta ---
+    def snapshot(self, as_of=None) -> pd.DataFrame:
+        """
+        Janelas de cada broker terminando no último pregão <= as_of (inclusive),
+        com o ranking de momentum (média diária de net flow da menor janela - da maior).
+        Só entram brokers com alguma linha na maior janela; date = último pregão do broker nela.
+        """
+        if not self.n_rows:
+            return pd.DataFrame(columns=["broker", "date"])
+        t = len(self.days) - 1 if as_of is None \
+            else int(np.searchsorted(self.days, np.datetime64(pd.Timestamp(as_of), "ns"), side="right")) - 1
+        if t < 0:
+            return pd.DataFrame(columns=["broker", "date"])
+
+        brokers = np.arange(len(self.brokers), dtype=np.int64)
+        day = np.full(len(brokers), t, dtype=np.int64)
+        last = self._last_row(brokers, day)
+        active = (last >= 0) & (self.day[np.maximum(last, 0)] > t - self.windows[-1])
+        brokers, day, last = brokers[active], day[active], last[active]
+
+        out = pd.DataFrame({
+            "broker": np.asarray(self.brokers, dtype=object)[brokers],
+            "date": self.dates[last],
+        })
+        for name, arr in self._window_stats(brokers, day).items():
+            out[name] = arr
+
+        short, long_ = self.windows[0], self.windows[-1]
+        out["momentum"] = out[f"net_{short}"] / short - out[f"net_{long_}"] / long_
+        for col in [f"net_{w}" for w in self.windows] + ["momentum"]:
+            out[f"rank_{col}"] = out[col].rank(ascending=False, method="min").astype("Int64")
+        return out
+
+
+def get_rolling_flow_engine(df: pd.DataFrame, windows=DEFAULT_WINDOWS) -> RollingFlowEngine:
+    """
+    Engine da versão de df, construído uma única vez por versão (compartilhado; não mutar).
+    Uma versão nova que só acrescenta pregões parte do engine mais recente em cache
+    (cópia + append); as versões anteriores continuam intactas para sessões que ainda as usam.
+    """
+    version = df.attrs.get("data_version")
+    windows = tuple(sorted(set(int(w) for w in windows)))
+    key = (version, windows)
+    with _ENGINE_LOCK:
+        if version is not None and key in _ENGINE_CACHE:
+            return _ENGINE_CACHE[key]
+
+        engine = None
+        previous = [e for (_, w), e in _ENGINE_CACHE.items() if w == windows]
+        if previous:
+            engine = max(previous, key=lambda e: e.last_date).extended(df)
+        if engine is None:
+            engine = RollingFlowEngine(windows).fit(df)
+
+        if version is not None:
+            if len(_ENGINE_CACHE) >= _MAX_CACHED_VERSIONS:
+                _ENGINE_CACHE.pop(next(iter(_ENGINE_CACHE)))
+            _ENGINE_CACHE[key] = engine
+        return engine
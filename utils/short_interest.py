@@ -0,0 +1,32 @@
+# utils/short_interest.py
+from __future__ import annotations
+
+from typing import Tuple
+import pandas as pd
+
+
+def detect_short_interest_peaks(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, float, str]:
+    """
+    Soma o short interest por data e detecta os picos.
+    Limiar: μ + 2σ (ou quantil 0.95 quando σ = 0).
+    Retorna (sir_by_date, peaks_by_date, threshold, method_label).
+    """
+    tmp = df[["date", "short_interest"]].copy()
+    tmp["date"] = pd.to_datetime(tmp["date"], errors="coerce")
+    tmp["short_interest"] = pd.to_numeric(tmp["short_interest"], errors="coerce")
+
+    sir_by_date = (
+        tmp.groupby("date", as_index=False)["short_interest"]
+           .sum()
+           .sort_values("date")
+    )
+
+    mu = sir_by_date["short_interest"].mean()
+    sd = sir_by_date["short_interest"].std(ddof=0)
+    if pd.notna(sd) and sd > 0:
+        threshold = float(mu + 2*sd); method_label = "μ + 2σ"
+    else:
+        threshold = float(sir_by_date["short_interest"].quantile(0.95)); method_label = "q > 0.95"
+    peaks_by_date = sir_by_date[sir_by_date["short_interest"] > threshold]
+
+    return sir_by_date, peaks_by_date, threshold, method_label
@@ -1,26 +1,31 @@
+import numpy as np
 import pandas as pd
 
+from .trading_calendar import calendar_codes, code_labels
+
 def get_weekly_top5_brokers(df, n_top=5):
     # Garante que a data esteja formatada corretamente
     df["date"] = pd.to_datetime(df["date"])
-    
-    # Cria coluna de semana (segunda-feira de cada semana)
-    df["week"] = df["date"] - pd.to_timedelta(df["date"].dt.weekday, unit="d")
+
+    # Semana (segunda-feira) via calendário: week_id inteiro decodificado contra o calendário da base
+    cal, week_id = calendar_codes(df, "week_id")
 
     # Cria coluna de volume líquido
     df["net_volume"] = df["buy_volume"] - df["sell_volume"]
 
-    # Agrupa por semana e broker
-    grouped = df.groupby(["week", "broker"], as_index=False)["net_volume"].sum()
+    # Agrupa por semana e broker (groupby inteiro)
+    grouped = (pd.DataFrame({"week_id": week_id, "broker": df["broker"].to_numpy(),
+                             "net_volume": df["net_volume"].to_numpy()})
+                 .groupby(["week_id", "broker"], as_index=False)["net_volume"].sum())
 
     # Obter top N por semana
-    top5_list = []
-    for week, group in grouped.groupby("week"):
-        top = group.sort_values("net_volume", ascending=False).head(n_top)
-        top["rank"] = range(1, len(top) + 1)
-        top5_list.append(top)
+    weekly_top5 = (grouped.sort_values(["week_id", "net_volume"], ascending=[True, False], kind="stable")
+                          .groupby("week_id").head(n_top))
+    weekly_top5["rank"] = weekly_top5.groupby("week_id").cumcount() + 1
 
-    weekly_top5 = pd.concat(top5_list).reset_index(drop=True)
+    week_start = code_labels(cal, "week_id", "week_start")
+    weekly_top5.insert(0, "week", week_start[weekly_top5["week_id"].to_numpy()])
+    weekly_top5 = weekly_top5.drop(columns="week_id").reset_index(drop=True)
     return weekly_top5
 
 
@@ -50,3 +55,52 @@ def analyze_broker_flow(weekly_top5):
         })
 
     return pd.DataFrame(transitions)
+
+
+def weekly_net_flow_matrix(df):
+    """
+    Pivot denso broker × semana do net flow (buy_volume - sell_volume) em uma passada.
+    Usa o week_id do calendário e np.bincount sobre o índice linear (broker, semana).
+    Retorna (matrix [n_brokers, n_weeks], brokers, week_starts).
+    """
+    cal, week_id = calendar_codes(df, "week_id")
+    week_starts = code_labels(cal, "week_id", "week_start")
+    # só as semanas cobertas por df (o calendário da base pode ser mais longo que um recorte)
+    if len(week_id):
+        first, last = int(week_id.min()), int(week_id.max())
+        week_id, week_starts = week_id.astype(np.int64) - first, week_starts[first:last + 1]
+
+    broker_id, brokers = pd.factorize(df["broker"], sort=True)
+    net = (pd.to_numeric(df["buy_volume"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+           - pd.to_numeric(df["sell_volume"], errors="coerce").fillna(0).to_numpy(dtype=np.float64))
+
+    n_brokers, n_weeks = len(brokers), len(week_starts)
+    valid = broker_id >= 0
+    flat = broker_id[valid].astype(np.int64) * n_weeks + week_id[valid]
+    matrix = np.bincount(flat, weights=net[valid], minlength=n_brokers * n_weeks).reshape(n_brokers, n_weeks)
+    return matrix, np.asarray(brokers), week_starts
+
+
+def order_flow_rows(matrix, order="total", top_k=50):
+    """
+    Seleciona as top_k linhas mais ativas (soma de |net flow|) e define a ordem das linhas.
+      - order="total":   net flow total, do maior comprador ao maior vendedor
+      - order="cluster": ordenação espectral (1º vetor singular das linhas normalizadas),
+                         que deixa brokers com perfil semanal parecido lado a lado
+    Retorna os índices das linhas na ordem de exibição.
+    """
+    activity = np.abs(matrix).sum(axis=1)
+    k = min(top_k, matrix.shape[0])
+    rows = np.argpartition(-activity, k - 1)[:k] if k < matrix.shape[0] else np.arange(matrix.shape[0])
+    sub = matrix[rows]
+
+    if order == "cluster" and len(rows) > 2:
+        norms = np.linalg.norm(sub, axis=1, keepdims=True)
+        unit = np.divide(sub, norms, out=np.zeros_like(sub), where=norms > 0)
+        unit -= unit.mean(axis=0, keepdims=True)
+        _, _, vt = np.linalg.svd(unit, full_matrices=False)
+        key = -(unit @ vt[0])
+    else:
+        key = -sub.sum(axis=1)
+
+    return rows[np.argsort(key, kind="stable")]
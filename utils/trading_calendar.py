@@ -0,0 +1,129 @@
+# utils/trading_calendar.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# colunas inteiras anexadas a cada linha na ingestão
+CALENDAR_CODE_COLUMNS = ["trading_day", "week_id", "month_id", "quarter_id"]
+
+# calendário da base completa por versão (df.attrs["data_version"]), registrado na ingestão:
+# {versão: (calendário, nº de linhas da base)}
+_CALENDAR_CACHE: dict[str, tuple[pd.DataFrame, int]] = {}
+_MAX_CACHED_VERSIONS = 4
+
+
+def _dense_codes(values: pd.DatetimeIndex) -> np.ndarray:
+    """Códigos 0..k-1 em ordem cronológica."""
+    return np.unique(values.asi8, return_inverse=True)[1].astype(np.int32)
+
+
+def build_calendar(dates) -> pd.DataFrame:
+    """
+    Tabela de calendário: uma linha por data de pregão presente nos dados.
+    Colunas: date, trading_day (ordinal), week_start (segunda-feira), month, quarter,
+             week_id, month_id, quarter_id (códigos inteiros densos, crescentes no tempo).
+    """
+    d = pd.DatetimeIndex(pd.to_datetime(pd.Series(dates)).dropna().unique()).normalize().unique().sort_values()
+
+    week_start = d - pd.to_timedelta(d.weekday, unit="D")
+    month = d.to_period("M").to_timestamp()
+    quarter = d.to_period("Q").to_timestamp()
+
+    return pd.DataFrame({
+        "date": d,
+        "trading_day": np.arange(len(d), dtype=np.int32),
+        "week_start": week_start,
+        "month": month,
+        "quarter": quarter,
+        "week_id": _dense_codes(week_start),
+        "month_id": _dense_codes(month),
+        "quarter_id": _dense_codes(quarter),
+    })
+
+
+def register_calendar(version: str | None, cal: pd.DataFrame, n_rows: int) -> None:
+    """
+    Registra o calendário da base completa (n_rows linhas) para a versão.
+    Só a ingestão chama: recortes herdam attrs["data_version"] e nunca podem virar o calendário da versão.
+    """
+    if version is None:
+        return
+    if version not in _CALENDAR_CACHE and len(_CALENDAR_CACHE) >= _MAX_CACHED_VERSIONS:
+        _CALENDAR_CACHE.pop(next(iter(_CALENDAR_CACHE)))
+    _CALENDAR_CACHE[version] = (cal, n_rows)
+
+
+def base_calendar(df: pd.DataFrame) -> pd.DataFrame | None:
+    """Calendário da base completa da versão de df (None se a versão não foi registrada)."""
+    entry = _CALENDAR_CACHE.get(df.attrs.get("data_version"))
+    return entry[0] if entry is not None else None
+
+
+def is_full_base(df: pd.DataFrame) -> bool:
+    """True se df é a base completa registrada para a sua versão (e não um recorte dela)."""
+    entry = _CALENDAR_CACHE.get(df.attrs.get("data_version"))
+    return entry is not None and len(df) == entry[1]
+
+
+def get_calendar(df: pd.DataFrame, date_col: str = "date") -> pd.DataFrame:
+    """
+    Calendário da base completa registrado na ingestão para a versão de df.
+    Sem registro, constrói a partir das datas de df, sem cache (df pode ser um recorte).
+    """
+    cal = base_calendar(df)
+    return cal if cal is not None else build_calendar(df[date_col])
+
+
+def _positions(cal: pd.DataFrame, dates: pd.Series) -> np.ndarray | None:
+    """Posição de cada data no calendário (None se alguma data não estiver nele)."""
+    cal_dates = cal["date"].to_numpy()
+    values = pd.to_datetime(dates).dt.normalize().to_numpy()
+    if len(values) == 0:
+        return np.empty(0, dtype=np.intp)
+    if len(cal_dates) == 0:
+        return None
+    pos = np.clip(np.searchsorted(cal_dates, values), 0, len(cal_dates) - 1)
+    if not np.array_equal(cal_dates[pos], values):
+        return None
+    return pos
+
+
+def attach_calendar(df: pd.DataFrame, cal: pd.DataFrame | None = None, date_col: str = "date") -> pd.DataFrame:
+    """
+    Anexa (in place) as colunas inteiras do calendário a cada linha:
+    trading_day, week_id, month_id, quarter_id.
+    Agrupamentos semanais/mensais viram um groupby inteiro barato.
+    """
+    cal = cal if cal is not None else get_calendar(df, date_col)
+    pos = _positions(cal, df[date_col])
+    if pos is None:  # datas fora do calendário em cache -> recalcula só para este df
+        cal = build_calendar(df[date_col])
+        pos = _positions(cal, df[date_col])
+
+    for col in CALENDAR_CODE_COLUMNS:
+        df[col] = cal[col].to_numpy()[pos]
+    return df
+
+
+def code_labels(cal: pd.DataFrame, code_col: str, label_col: str) -> np.ndarray:
+    """Vetor label[code] (ex.: week_start por week_id) para decodificar agrupamentos."""
+    first = cal.drop_duplicates(code_col).sort_values(code_col)
+    return first[label_col].to_numpy()
+
+
+def calendar_codes(df: pd.DataFrame, code_col: str, date_col: str = "date") -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    (calendário, código por linha) consistentes entre si, ex.: trading_day ou week_id.
+    As colunas anexadas na ingestão só valem contra o calendário da base completa;
+    sem ele (ou com datas fora dele) os códigos são recalculados sobre as datas de df, sem alterar df.
+    """
+    cal = base_calendar(df)
+    if cal is not None and code_col in df.columns:
+        return cal, df[code_col].to_numpy()
+
+    pos = _positions(cal, df[date_col]) if cal is not None else None
+    if pos is None:
+        cal = build_calendar(df[date_col])
+        pos = _positions(cal, df[date_col])
+    return cal, cal[code_col].to_numpy()[pos]